@@ -0,0 +1,34 @@
+"""
+Compares the outputs of the ONNX int8 backend against the stock PyTorch pipelines.
+Uses the recorded Tavily fixtures when present, otherwise the synthetic benchmark corpus.
+Needs the real checkpoints (local HF cache) and the packages of requirements-onnx.txt.
+
+Usage:
+    python -m benchmarks.check_backend_accuracy --articles 50
+"""
+import argparse
+import json
+
+from benchmarks.fakes import load_fixtures, synthetic_articles
+from src.model_registry import ModelRegistry
+from src.onnx_backend import compare_backends
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    articles = []
+    for topic in ("general", "research"):
+        for response in load_fixtures(topic).values():
+            articles.extend(response["results"])
+    articles = (articles or synthetic_articles(args.articles))[:args.articles]
+    texts = [f"{a['title']}\n{a['content']}" for a in articles]
+
+    report = compare_backends(texts, ModelRegistry(backend="pytorch"), ModelRegistry(backend="onnx"))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
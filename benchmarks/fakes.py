@@ -0,0 +1,217 @@
+"""
+Offline stand-ins for the external services used by the report pipeline.
+Tavily answers from recorded fixtures (or a deterministic synthetic corpus), the LLM and NLP
+models are deterministic functions of their input, and Notion only records the calls it gets.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ENTITIES = [
+    "European Commission", "NIST", "White House", "UNESCO", "OpenAI", "DeepMind", "Meta",
+    "Anthropic", "Hugging Face", "Stanford", "MIT", "China", "France", "Spain", "NeurIPS",
+    "ICML", "Nvidia", "Microsoft", "Google", "Mistral", "United Nations", "Reuters",
+]
+WORDS = (
+    "policy regulation model training inference benchmark framework investment strategy "
+    "governance safety alignment transformer dataset evaluation compute funding research "
+    "scaling deployment risk oversight standard proposal agreement architecture quantization"
+).split()
+
+
+def _seed(*parts):
+    return int(hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:16], 16)
+
+
+def synthetic_article(query, index, n_words=220):
+    """
+    Builds a deterministic fake Tavily result for a query.
+    """
+    rng = random.Random(_seed(query, index))
+    words = []
+    for _ in range(n_words):
+        words.append(rng.choice(ENTITIES) if rng.random() < 0.08 else rng.choice(WORDS))
+    content = " ".join(words).capitalize() + "."
+    return {
+        "title": f"{rng.choice(ENTITIES)} {rng.choice(WORDS)} update {index}",
+        "url": f"https://example.org/{_seed(query, index) % 10 ** 8}",
+        "content": content,
+        "score": round(rng.random(), 3),
+    }
+
+
+def synthetic_articles(n, seed="bench"):
+    """
+    Returns n deterministic fake Tavily results.
+    """
+    return [synthetic_article(seed, i) for i in range(n)]
+
+
+def load_fixtures(topic):
+    """
+    Loads the recorded Tavily responses of a topic, keyed by query. Missing file means no recordings.
+    """
+    path = os.path.join(FIXTURES_DIR, f"tavily_{topic}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeTavily:
+    """
+    Tavily client answering from recorded fixtures, falling back to synthetic results.
+    Args:
+        fixtures (dict): Recorded responses keyed by query.
+        latency (float): Seconds to sleep per search, to emulate the network.
+    """
+
+    def __init__(self, fixtures=None, latency=0.0):
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query, max_results=3, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if query in self.fixtures:
+            return self.fixtures[query]
+        return {"query": query, "results": [synthetic_article(query, i) for i in range(max_results)]}
+
+
+class FakeMessage:
+    def __init__(self, content, prompt):
+        self.content = content
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+
+class FakeLLM:
+    """
+    Deterministic chat model. Question-generation prompts get a list of questions, any other
+    prompt gets a Markdown article built from the citations found in the prompt.
+    Args:
+        latency (float): Seconds to sleep per call.
+    """
+    model_name = "fake-llm"
+    temperature = 0
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, prompt):
+        rng = random.Random(_seed(prompt))
+        if "specific questions to be answered" in prompt:
+            return "\n".join(f"- What does {rng.choice(ENTITIES)} propose about {rng.choice(WORDS)}?" for _ in range(4))
+
+        refs = sorted(set(re.findall(r"\[(\d+)\]", prompt)), key=int)[:40]
+        lines = ["## Overview", ""]
+        for i in range(0, max(len(refs), 1), 3):
+            cites = "".join(f"[{r}]" for r in refs[i:i + 3])
+            lines.append(" ".join(rng.choice(WORDS) for _ in range(60)) + f" {cites}")
+            lines.append("")
+        lines += ["## Recommendations", ""]
+        lines += [f"- {rng.choice(ENTITIES)} should review {rng.choice(WORDS)}." for _ in range(3)]
+        return "\n".join(lines)
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeMessage(self._respond(str(prompt)), str(prompt))
+
+    def stream(self, prompt):
+        message = self.invoke(prompt)
+        for i in range(0, len(message.content), 16):
+            yield FakeMessage(message.content[i:i + 16], "")
+
+
+class _FakePages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, **kwargs):
+        self.client.calls.append(("pages.create", kwargs))
+        page_id = f"page-{len(self.client.page_blocks)}"
+        self.client.page_blocks[page_id] = list(kwargs.get("children", []))
+        return {"id": page_id, "url": f"https://www.notion.so/{page_id}"}
+
+
+class _FakeBlockChildren:
+    def __init__(self, client):
+        self.client = client
+
+    def append(self, block_id, children, **kwargs):
+        self.client.calls.append(("blocks.children.append", {"block_id": block_id, "children": children}))
+        self.client.page_blocks.setdefault(block_id, []).extend(children)
+        return {"results": children}
+
+
+class _FakeBlocks:
+    def __init__(self, client):
+        self.children = _FakeBlockChildren(client)
+
+
+class FakeNotion:
+    """
+    Notion client stub that keeps the created pages and their blocks in memory.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.page_blocks = {}
+        self.pages = _FakePages(self)
+        self.blocks = _FakeBlocks(self)
+
+
+class _FakeNER:
+    def __call__(self, texts, batch_size=1, **kwargs):
+        single = isinstance(texts, str)
+        outputs = []
+        for text in [texts] if single else texts:
+            outputs.append([
+                {"entity_group": "ORG", "word": m.group(0), "score": 0.9 + (len(m.group(0)) % 10) / 100,
+                 "start": m.start(), "end": m.end()}
+                for m in re.finditer(r"\b[A-Z][A-Za-z]+(?: [A-Z][A-Za-z]+)*\b", text)
+            ])
+        return outputs[0] if single else outputs
+
+
+class _FakeSentiment:
+    def __call__(self, texts, batch_size=1, **kwargs):
+        outputs = []
+        for text in [texts] if isinstance(texts, str) else texts:
+            value = _seed(text) % 1000 / 1000
+            outputs.append({"label": "POSITIVE" if value > 0.5 else "NEGATIVE", "score": 0.5 + abs(value - 0.5)})
+        return outputs
+
+
+class _FakeQA:
+    def __call__(self, inputs=None, batch_size=1, question=None, context=None, **kwargs):
+        if inputs is None:
+            inputs = [{"question": question, "context": context}]
+        outputs = []
+        for item in inputs:
+            sentence = item["context"].split(".")[0][:80]
+            outputs.append({"answer": sentence, "score": _seed(item["question"], sentence) % 100 / 100,
+                            "start": 0, "end": len(sentence)})
+        return outputs[0] if len(outputs) == 1 else outputs
+
+
+def fake_pipeline(task, model=None, **kwargs):
+    """
+    Drop-in replacement for transformers.pipeline returning deterministic fake models.
+    """
+    return {"ner": _FakeNER, "sentiment-analysis": _FakeSentiment, "question-answering": _FakeQA}[task]()
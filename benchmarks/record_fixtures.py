@@ -0,0 +1,36 @@
+"""
+Records live Tavily responses for every query of both topics into benchmarks/fixtures/.
+Needs TAVILY_API_KEY; the benchmark suite then replays the recordings without network access.
+
+Usage:
+    python -m benchmarks.record_fixtures --topics general research
+"""
+import argparse
+import json
+import os
+
+from benchmarks.fakes import FIXTURES_DIR
+from src.query_definitions import get_ai_general_queries, get_ai_research_queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topics", nargs="+", default=["general", "research"])
+    parser.add_argument("--max-results", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from lambda_function import default_tavily
+
+    tavily = default_tavily()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for topic in args.topics:
+        queries = get_ai_general_queries() if topic == "general" else get_ai_research_queries()
+        recorded = {query: tavily.search(query=query, max_results=args.max_results) for query in queries.values()}
+        path = os.path.join(FIXTURES_DIR, f"tavily_{topic}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(recorded, f, indent=2, ensure_ascii=False)
+        print(f"Recorded {len(recorded)} responses to {path}")
+
+
+if __name__ == "__main__":
+    main()
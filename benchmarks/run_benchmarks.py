@@ -0,0 +1,287 @@
+"""
+Offline benchmark suite for the report pipeline.
+Runs lambda_function.run end to end for both topics against recorded Tavily responses, a
+deterministic fake LLM and a stub Notion client, plus micro-benchmarks of the pipeline steps
+at scaled article counts. Results can be saved as a named baseline and compared between commits.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 10 100 1000 --save-baseline main
+    python -m benchmarks.run_benchmarks --compare main
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fakes import FakeLLM, FakeNotion, FakeTavily, fake_pipeline, load_fixtures, synthetic_articles
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def percentile(samples, q):
+    """
+    Returns the q-th percentile (0-100) of the samples with linear interpolation.
+    """
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(fn, items, repeat, warmup=1):
+    """
+    Times fn() `repeat` times after `warmup` untimed calls.
+    Args:
+        fn (callable): Function to benchmark.
+        items (int): Number of items processed per call, used for throughput.
+        repeat (int): Number of timed calls.
+        warmup (int): Number of untimed calls.
+    Returns:
+        dict: Latency percentiles in seconds and throughput in items per second.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    p50 = percentile(samples, 50)
+    return {
+        "items": items,
+        "repeat": repeat,
+        "p50": p50,
+        "p90": percentile(samples, 90),
+        "p99": percentile(samples, 99),
+        "min": min(samples),
+        "throughput": items / p50 if p50 else float("inf"),
+    }
+
+
+def use_models(kind, backend="pytorch"):
+    """
+    Points the model registry at the deterministic fake pipelines, or at the real checkpoints
+    on the given inference backend.
+    """
+    from src.model_registry import registry
+
+    registry.set_backend(backend)
+    if kind == "fake":
+        registry._loader = fake_pipeline
+        registry._models.clear()
+
+
+def bench_process_news_results(size, repeat):
+    from src.nlp_pipeline import process_news_results
+
+    articles = synthetic_articles(size)
+    return measure(lambda: process_news_results(articles), size, repeat)
+
+
+def _sections(size):
+    from src.nlp_pipeline import process_news_results
+
+    articles = synthetic_articles(size)
+    entries = process_news_results(articles)
+    for entry in entries:
+        entry["qa_questions"] = ["What does the article propose?"]
+    return [
+        {"section_title": f"Section {i // 3}", "entries": entries[i:i + 3]}
+        for i in range(0, len(entries), 3)
+    ]
+
+
+def bench_format_articles_for_prompt(size, repeat):
+    from src.formatter import format_articles_for_prompt
+
+    sections = _sections(size)
+    return measure(lambda: format_articles_for_prompt(sections), size, repeat)
+
+
+def bench_markdown_to_blocks(size, repeat):
+    from src.upload_to_notion import markdown_to_blocks
+
+    llm = FakeLLM()
+    parts = []
+    for i in range(size):
+        parts.append(llm.invoke(f"[{i}] article {i}").content)
+    markdown = "\n\n".join(parts)
+    return measure(lambda: markdown_to_blocks(markdown), size, repeat)
+
+
+def bench_build_entity_graph(size, repeat):
+    from src.nlp_pipeline import build_entity_graph
+    from src.model_registry import get_model
+
+    ner = get_model("ner")
+    entities = ner([f"{a['title']}\n{a['content']}" for a in synthetic_articles(size)])
+    return measure(lambda: [build_entity_graph(e) for e in entities], size, repeat)
+
+
+def bench_run(topic, repeat):
+    import lambda_function
+    from src import upload_to_notion
+
+    # The stub Notion client is not rate limited; keep Notion's 3 req/s limit out of the timings.
+    upload_to_notion._rate_limiter = upload_to_notion.TokenBucket(rate=1e9, capacity=1e9)
+
+    topics = lambda_function.resolve_topics({"topic": topic})
+    n_queries = sum(len(lambda_function.TOPICS[t]["queries"]()) for t in topics)
+    fixtures = {}
+    for t in topics:
+        fixtures.update(load_fixtures(t))
+
+    def call():
+        with tempfile.TemporaryDirectory() as cache_dir:
+            lambda_function.run(
+                {"topic": topic, "cache_dir": cache_dir},
+                llm=FakeLLM(),
+                tavily=FakeTavily(fixtures),
+                notion=FakeNotion(),
+            )
+
+    return measure(call, n_queries, repeat)
+
+
+def bench_entity_index(size, repeat):
+    from src.entity_index import EntityIndex, article_centralities, entity_runs
+    from src.model_registry import get_model
+
+    ner = get_model("ner")
+    runs = [entity_runs(e) for e in ner([f"{a['title']}\n{a['content']}" for a in synthetic_articles(size)])]
+
+    def call():
+        article_centralities(runs)
+        index = EntityIndex()
+        index.add(runs)
+        index.key_actors()
+
+    return measure(call, size, repeat)
+
+
+MICRO_BENCHMARKS = {
+    "process_news_results": bench_process_news_results,
+    "format_articles_for_prompt": bench_format_articles_for_prompt,
+    "markdown_to_blocks": bench_markdown_to_blocks,
+    "build_entity_graph": bench_build_entity_graph,
+    "entity_index": bench_entity_index,
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat, topics, only=None):
+    """
+    Runs the micro-benchmarks at every size and the end-to-end run for every topic.
+    Returns:
+        dict: Benchmark document with environment metadata and one result per benchmark name.
+    """
+    results = {}
+    for name, bench in MICRO_BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for size in sizes:
+            key = f"{name}[{size}]"
+            print(f"Running {key}...", file=sys.stderr)
+            results[key] = bench(size, repeat)
+
+    for topic in topics:
+        key = f"run[{topic}]"
+        if only and "run" not in only:
+            continue
+        print(f"Running {key}...", file=sys.stderr)
+        # The end-to-end run prints its own progress; keep the report readable.
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        try:
+            results[key] = bench_run(topic, max(1, repeat // 5))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Prints the p50 ratio of each benchmark against a baseline.
+    Returns:
+        list: Names of the benchmarks whose p50 grew by more than `threshold`.
+    """
+    regressions = []
+    print(f"{'benchmark':45} {'baseline p50':>14} {'current p50':>14} {'ratio':>8}")
+    for key, result in current["results"].items():
+        previous = baseline["results"].get(key)
+        if not previous:
+            continue
+        ratio = result["p50"] / previous["p50"] if previous["p50"] else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{key:45} {previous['p50']:14.6f} {result['p50']:14.6f} {ratio:8.2f}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def print_results(document):
+    print(f"{'benchmark':45} {'p50 (s)':>12} {'p90 (s)':>12} {'p99 (s)':>12} {'items/s':>12}")
+    for key, result in document["results"].items():
+        print(f"{key:45} {result['p50']:12.6f} {result['p90']:12.6f} {result['p99']:12.6f} {result['throughput']:12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--topics", nargs="+", default=["general", "research", "all"])
+    parser.add_argument("--only", nargs="+", help="Benchmark names to run (micro-benchmark names or 'run').")
+    parser.add_argument("--models", choices=["fake", "real"], default="fake",
+                        help="Deterministic fake NLP models, or the real checkpoints from the local HF cache.")
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], default="pytorch",
+                        help="Inference backend of the real models.")
+    parser.add_argument("--output", help="Write the results document to this file.")
+    parser.add_argument("--save-baseline", help="Save the results as benchmarks/baselines/<name>.json.")
+    parser.add_argument("--compare", help="Compare against benchmarks/baselines/<name>.json.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative p50 slowdown reported as a regression.")
+    args = parser.parse_args(argv)
+
+    use_models(args.models, args.backend)
+    document = run_suite(args.sizes, args.repeat, args.topics, args.only)
+    document["models"] = args.models
+    document["backend"] = args.backend
+    print_results(document)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(os.path.join(BASELINES_DIR, f"{args.save_baseline}.json"), "w") as f:
+            json.dump(document, f, indent=2)
+    if args.compare:
+        with open(os.path.join(BASELINES_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if compare(document, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,8 @@ Lambda function to generate AI weekly reports based on Tavily search results and
 # This function processes news results, generates questions, formats articles, and uploads the final report to Notion.
 # This script is designed to be run as an AWS Lambda function.
 # It uses the Tavily API for news search and OpenAI's LLM for text generation.
-# It supports two topics: 'general' for AI policy and investment, and 'research' for AI research trends.
+# It supports two topics: 'general' for AI policy and investment, and 'research' for AI research trends,
+# which can be produced together in one invocation ('topics' payload or --topic all).
 # It processes the search results, generates questions, formats the articles, and uploads the final report to Notion.
 # It requires the following environment variables:
 # - OPENAI_API_KEY: API key for OpenAI.
@@ -16,63 +17,333 @@ Lambda function to generate AI weekly reports based on Tavily search results and
 # It uses the Tavily API to search for news articles based on predefined queries, processes the results using NLP techniques, 
 # and generates a formatted report that is uploaded to Notion.
 """
-from src.upload_to_notion import upload_to_notion
-from src.config import OPENAI_API_KEY, TAVILY_API_KEY
+from src.upload_to_notion import upload_to_notion, stream_to_notion
+from src.config import TAVILY_API_KEY, CACHE_DIR, CACHE_MAX_BYTES, ARTICLE_DB_PATH, require_keys
 from src.query_definitions import get_ai_general_queries, get_ai_research_queries
-from src.nlp_pipeline import process_news_results, generate_qa_questions
-from src.formatter import format_articles_for_prompt, build_references_section
-from src.generator import load_prompt, generate_article, load_static_text
-from langchain_openai import ChatOpenAI
-from tavily import TavilyClient
-from datetime import datetime
+from src.nlp_pipeline import process_news_results, generate_qa_questions, DEFAULT_BATCH_SIZE
+from src.executor import PipelinedExecutor, DEFAULT_MAX_CONCURRENCY
+from src.model_registry import registry
+from src.parallel import NLPWorkerPool
+from src.cache import DiskCache, make_key
+from src.article_store import ArticleStore, DeltaAnnotator, delta_sections
+from src.llm_cache import CachingLLM
+from src.tracing import Tracer, set_tracer, trace, in_context
+from src.entity_index import EntityIndex, DEFAULT_KEY_ACTORS
+from src.formatter import build_prompt_material, build_references_section, format_key_actors, DEFAULT_TOKEN_BUDGET
+from src.generator import (load_prompt, generate_article, generate_article_map_reduce, load_static_text,
+                           stream_article, digest_sections)
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from datetime import datetime, timedelta
 import argparse
 import os
 
 
-def run(payload: dict):
-    topic = payload.get("topic", "general")
+def default_llm():
+    from langchain_openai import ChatOpenAI
 
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    tavily = TavilyClient(api_key=TAVILY_API_KEY)
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    require_keys("OPENAI_API_KEY")
+    # stream_usage reports token usage on the last chunk of streamed responses.
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0, stream_usage=True)
 
-    if topic == "general":
-        queries = get_ai_general_queries()
-        prompt_path = os.path.join(BASE_DIR, "prompts", "ai_general_prompt.md")
-        title = "International AI Policy and Investment Overview"
-    elif topic == "research":
-        queries = get_ai_research_queries()
-        prompt_path = os.path.join(BASE_DIR, "prompts", "ai_research_prompt.md")
-        title = "Emerging Trends in AI Research and Algorithms"
-    else:
-        raise ValueError(f"Unsupported topic '{topic}'.")
 
+def default_tavily():
+    from tavily import TavilyClient
+
+    require_keys("TAVILY_API_KEY")
+    return TavilyClient(api_key=TAVILY_API_KEY)
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TOPICS = {
+    "general": {
+        "queries": get_ai_general_queries,
+        "prompt": "ai_general_prompt.md",
+        "title": "International AI Policy and Investment Overview",
+    },
+    "research": {
+        "queries": get_ai_research_queries,
+        "prompt": "ai_research_prompt.md",
+        "title": "Emerging Trends in AI Research and Algorithms",
+    },
+}
+
+
+def resolve_topics(payload):
+    """
+    Returns the topics requested by a payload: a `topics` list, or a single `topic`.
+    'all' expands to every topic defined in TOPICS.
+    """
+    topics = payload.get("topics") or [payload.get("topic", "general")]
+    if "all" in topics:
+        return list(TOPICS)
+    for topic in topics:
+        if topic not in TOPICS:
+            raise ValueError(f"Unsupported topic '{topic}'.")
+    return list(dict.fromkeys(topics))
+
+
+def report_date(payload):
+    """
+    Returns the report date of a payload: its 'date' (YYYY-MM-DD), or today.
+    A past date only relabels the report (title and search cache week): searches still return
+    current results. It is therefore rejected in delta mode, whose article store records when
+    articles were seen.
+    """
+    today = datetime.now()
+    if not payload.get("date"):
+        return today
+    date = datetime.strptime(payload["date"], "%Y-%m-%d")
+    if payload.get("delta") and date.date() != today.date():
+        raise ValueError("Delta mode cannot be combined with a past report date.")
+    return date
+
+
+def section_questions(llm, results, store=None):
+    """
+    Generates the questions of a section's search results, one per result position: the question
+    at position i belongs to results[i]. With an article store (delta mode), only new or changed
+    articles get a question and the others get None.
+    """
+    positions = [i for i, r in enumerate(results) if store.lookup(r) is None] if store else range(len(results))
+    if not positions:
+        return []
+    with trace("generate_qa_questions", items=len(positions)):
+        entries_preview = [{"title": results[i]["title"], "summary": results[i]["content"][:300]} for i in positions]
+        generated = generate_qa_questions(llm, entries_preview, n_questions=4)
+    if not store:
+        return generated
+    aligned = [None] * len(results)
+    for i, question in zip(positions, generated):
+        aligned[i] = question
+    return aligned
+
+
+def topic_sections(sections):
+    """
+    Builds the report sections of one topic from the executor output.
+    Entries are copied per topic, because the formatter assigns topic-specific reference ids;
+    an entry shared by several sections of the topic still maps to a single copy.
+    """
+    copies = {}
     all_articles = []
+    for section in sections:
+        entries = []
+        for entry, question in zip(section.entries, section.entry_questions):
+            if id(entry) not in copies:
+                copy = dict(entry)
+                # Entries shared across sections keep the questions of the first section.
+                if question:
+                    copy.setdefault("qa_questions", question)
+                copies[id(entry)] = copy
+            entries.append(copies[id(entry)])
 
-    for section_title, query in queries.items():
-        print(f"[{topic.upper()}] → {section_title}")
-        results = tavily.search(query=query, max_results=3)
-        entries_preview = [{"title": r["title"], "summary": r["content"][:300]} for r in results["results"]]
-        qa_questions = generate_qa_questions(llm, entries_preview, n_questions=4)
-        entries = process_news_results(results["results"])
-        for entry, qa in zip(entries, qa_questions):
-            entry["qa_questions"] = qa
+        all_articles.append({"section_title": section.section_title[1], "entries": entries})
+    return all_articles
 
-        all_articles.append({"section_title": section_title, "entries": entries})
 
-    material, ref_list, updated_sections = format_articles_for_prompt(all_articles)
-    template = load_prompt(prompt_path)
+def build_report(topic, all_articles, payload, llm, notion=None, store=None, key_actors=None):
+    """
+    Formats the material of a topic, generates its article and uploads it to Notion.
+    In streaming mode the page is created first and filled while the article is generated.
+    With an article store (delta mode), only new or changed articles are reported.
+    `key_actors` is the formatted run-wide list of central entities given to the prompt.
+    Returns:
+        dict: The Notion API response of the created page, or None when delta mode found nothing new.
+    """
+    title = TOPICS[topic]["title"]
+    if store:
+        all_articles, n_new = delta_sections(all_articles, store, topic, payload.get("delta_context", 1))
+        print(f"[{topic.upper()}] New or changed articles: {n_new}")
+        if not n_new:
+            return None
+    with trace("format_articles_for_prompt", items=sum(len(s["entries"]) for s in all_articles)):
+        built = build_prompt_material(all_articles, token_budget=payload.get("token_budget", DEFAULT_TOKEN_BUDGET))
+    material, ref_list = built["material"], built["ref_list"]
+    print(f"[{topic.upper()}] Prompt tokens per section: {built['section_tokens']}")
+    template = load_prompt(os.path.join(BASE_DIR, "prompts", TOPICS[topic]["prompt"]))
     footer_path = os.path.join(BASE_DIR, "prompts", "footer.md")
     footer = load_static_text(footer_path)
-    article = generate_article(llm, template, material, title, datetime.now().strftime("%Y-%m-%d"))
-
+    date = payload.get("date") or datetime.now().strftime("%Y-%m-%d")
+    map_reduce = payload.get("generation", "single") == "map_reduce"
     references = build_references_section(ref_list)
+
+    if payload.get("stream"):
+        with trace("stream_report", items=len(built["section_texts"])):
+            if map_reduce:
+                digest_template = load_prompt(os.path.join(BASE_DIR, "prompts", "section_digest_prompt.md"))
+                material = digest_sections(
+                    llm, digest_template, built["section_texts"], title, date,
+                    max_concurrency=payload.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+                )
+            chunks = chain(
+                stream_article(llm, template, material, title, date, key_actors=key_actors),
+                [f"\n\n{footer}\n\n{references}"],
+            )
+            return stream_to_notion(chunks, title_prefix=title, notion=notion, date=date)
+
+    with trace("generate_article", items=len(built["section_texts"])):
+        if map_reduce:
+            digest_template = load_prompt(os.path.join(BASE_DIR, "prompts", "section_digest_prompt.md"))
+            article = generate_article_map_reduce(
+                llm, template, digest_template, built["section_texts"], title, date,
+                max_concurrency=payload.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+                key_actors=key_actors,
+            )
+        else:
+            article = generate_article(llm, template, material, title, date, key_actors=key_actors)
+
     final_markdown = f"{article}\n\n{footer}\n\n{references}"
-    upload_to_notion(final_markdown, title_prefix=title)
+    with trace("upload_to_notion"):
+        return upload_to_notion(final_markdown, title_prefix=title, notion=notion, date=date)
+
+
+def run(payload: dict, llm=None, tavily=None, notion=None):
+    # The backend is a process-level setting (NLP_BACKEND or --backend): switching it per
+    # invocation would unload models that concurrent runs are using.
+    if payload.get("backend") and payload["backend"] != registry.backend:
+        raise ValueError(
+            f"The NLP backend is '{registry.backend}'; set NLP_BACKEND or --backend to use '{payload['backend']}'."
+        )
+
+    if payload.get("warmup"):
+        # Pre-warm request: load the NLP models into this container and report their cost.
+        timings = registry.warm_up(payload.get("models"))
+        print(f"Model timings: {timings}")
+        return {"model_timings": timings}
+
+    topics = resolve_topics(payload)
+    today = report_date(payload)
+    tracer = set_tracer(Tracer(dimensions={"Topic": "+".join(topics)}))
+
+    tavily = tavily or default_tavily()
+
+    # Every topic shares one query set, so all searches feed a single annotation pass.
+    queries = {
+        (topic, section_title): query
+        for topic in topics
+        for section_title, query in TOPICS[topic]["queries"]().items()
+    }
+
+    batch_size = payload.get("batch_size", DEFAULT_BATCH_SIZE)
+    cache = DiskCache(payload.get("cache_dir", CACHE_DIR), max_bytes=CACHE_MAX_BYTES) if payload.get("cache", True) else None
+    llm = CachingLLM(llm or default_llm(), cache=cache)
+    # Delta mode: articles already processed by a previous run skip NLP and the LLM.
+    store = ArticleStore(payload.get("article_db", ARTICLE_DB_PATH)) if payload.get("delta") else None
+    # Search responses are reused within the same weekly window.
+    date_window = (today - timedelta(days=today.weekday())).strftime("%Y-%m-%d")
+
+    def search(query):
+        with trace("search") as span:
+            key = make_key(query, 3, date_window)
+            results = cache.get("search", key) if cache else None
+            if results is None:
+                results = tavily.search(query=query, max_results=3)["results"]
+                if cache:
+                    cache.set("search", key, results)
+            span.add(items=len(results))
+            return results
+
+    def questions(results):
+        return section_questions(llm, results, store)
+
+    # Worker processes are forked before the executor starts its threads.
+    workers = payload.get("nlp_workers", 1)
+    pool = NLPWorkerPool(workers, payload.get("intra_op_threads")) if workers > 1 else None
+
+    # Run-wide entity index, filled as each batch of articles is annotated.
+    entity_index = EntityIndex()
+
+    def annotate(results):
+        return process_news_results(results, batch_size=batch_size, cache=cache, pool=pool)
+
+    if store:
+        annotate = DeltaAnnotator(store, annotate)
+
+    def annotate_and_index(results):
+        entries = annotate(results)
+        entity_index.add_entries(entries)
+        return entries
+
+    executor = PipelinedExecutor(
+        search,
+        questions,
+        annotate_and_index,
+        max_concurrency=payload.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+        # A process pool only pays off when every worker gets a full model batch per call.
+        batch_size=pool.batch_articles(batch_size) if pool else batch_size,
+        mode=payload.get("executor", "threads"),
+        dedup=payload.get("dedup", True),
+    )
+    try:
+        sections = executor.run(queries, on_section=lambda key: print(f"[{key[0].upper()}] → {key[1]}"))
+    finally:
+        if pool:
+            pool.close()
+
+    if store:
+        # Record this run's articles; reports read the previously stored ones as context.
+        seen = today.strftime("%Y-%m-%d")
+        for section in sections:
+            for entry in section.entries:
+                store.upsert(entry, section.section_title[0], section.section_title[1], seen=seen)
+
+    with trace("key_actors", items=len(entity_index.names)):
+        key_actors = format_key_actors(entity_index.key_actors(payload.get("key_actors", DEFAULT_KEY_ACTORS)))
+    print(f"Key actors:\n{key_actors}")
+
+    # Reports of different topics are generated and uploaded in parallel.
+    with ThreadPoolExecutor(max_workers=len(topics)) as reports_pool:
+        futures = {
+            topic: reports_pool.submit(
+                in_context(build_report),
+                topic,
+                topic_sections([s for s in sections if s.section_title[0] == topic]),
+                payload,
+                llm,
+                notion,
+                store,
+                key_actors,
+            )
+            for topic in topics
+        }
+        reports = {}
+        for topic, future in futures.items():
+            page = future.result()
+            reports[topic] = page["url"] if page else None
+
+    print(f"Model timings: {registry.report()}")
+    if cache:
+        cache.flush()
+        print(f"Cache stats: {cache.report()}")
+    print(f"LLM stats: {llm.report()}")
+    if store:
+        print(f"Article store: {annotate.reused} reused, {annotate.annotated} annotated, {store.count()} stored")
+        store.close()
+
+    metrics = tracer.emit(payload.get("metrics_path"), extra={
+        "model_timings": registry.report(),
+        "llm": llm.report(),
+        "cache": cache.report() if cache else {},
+    })
+    result = {"reports": reports, "metrics": metrics}
+    if len(topics) == 1:
+        result["url"] = reports[topics[0]]
+    return result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--topic", choices=["general", "research"], default="general")
+    parser.add_argument("--topic", choices=["general", "research", "all"], default="general")
+    parser.add_argument("--warmup", action="store_true", help="Only load the NLP models and print their timings.")
+    parser.add_argument("--nlp-workers", type=int, default=1, help="Worker processes for NLP inference.")
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], help="NLP inference backend (default: NLP_BACKEND or pytorch).")
+    parser.add_argument("--delta", action="store_true", help="Only process and report articles that are new since the last run.")
+    parser.add_argument("--stream", action="store_true", help="Publish the report to Notion while it is generated.")
+    parser.add_argument("--date", help="Report date (YYYY-MM-DD) used in the title; searches still return current results.")
     args = parser.parse_args()
 
-    run({"topic": args.topic})
+    if args.backend:
+        registry.set_backend(args.backend)
+    run({"topic": args.topic, "warmup": args.warmup, "nlp_workers": args.nlp_workers,
+         "delta": args.delta, "stream": args.stream, "date": args.date})
@@ -0,0 +1,293 @@
+"""
+Resident worker service for the report pipeline.
+# Keeps the NLP models, the LLM, Tavily and Notion clients and the caches warm in one long-running
+# process, and runs report jobs from a persistent SQLite queue through lambda_function.run.
+# Jobs are submitted over a small HTTP API:
+# - POST /jobs        {"topic": "general" | "research" | "all", "date": "YYYY-MM-DD", ...JOB_OPTIONS}
+#                     → 202 {"id": ...}, or 429 when the queue is full (admission control).
+# - GET  /jobs/<id>   → the job status and, once done, its Notion URLs.
+# - GET  /health      → 200 when the models are loaded and the workers are running.
+# - GET  /stats       → job counts, rejections, throughput, mean job time and model timings.
+# Several jobs run at once (--workers); ad-hoc and backfill reports only pay inference time.
+# A backfill "date" only relabels the report (title and search cache week): Tavily still returns
+# current results, and it cannot be combined with "delta".
+# Usage:
+#   python service.py --port 8080 --workers 2 --max-queued 16
+#   curl -X POST localhost:8080/jobs -d '{"topic": "research", "date": "2025-06-02"}'
+"""
+from src.config import JOBS_DB_PATH
+from src.job_queue import JobQueue
+from src.model_registry import registry
+from src.upload_to_notion import get_notion_client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from functools import partial
+import lambda_function
+import argparse
+import json
+import re
+import signal
+import threading
+import time
+import traceback
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUED = 16
+# Workers also poll the queue, for jobs added while they were busy.
+POLL_SECONDS = 5.0
+# Run options a job may set, with their accepted types. Everything else (the backend, worker
+# processes, and the cache, article store and metrics paths) is a service setting taken from
+# the command line or the environment.
+JOB_OPTIONS = {
+    "topic": str,
+    "topics": list,
+    "date": str,
+    "delta": bool,
+    "delta_context": int,
+    "stream": bool,
+    "generation": str,
+    "token_budget": int,
+    "max_concurrency": int,
+    "batch_size": int,
+    "key_actors": int,
+    "dedup": bool,
+    "executor": str,
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def validate_job(payload):
+    """
+    Checks a job payload before it is queued.
+    Args:
+        payload (dict): Job payload (topic or topics, optional date and run options).
+    Raises:
+        ValueError: If the payload cannot be run by the service.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The job payload must be a JSON object.")
+    rejected = [key for key in payload if key not in JOB_OPTIONS]
+    if rejected:
+        raise ValueError(f"Options that cannot be set per job: {', '.join(rejected)}.")
+    for key, value in payload.items():
+        expected = JOB_OPTIONS[key]
+        # JSON booleans are ints in Python, but not valid counts.
+        if value is not None and (not isinstance(value, expected) or (expected is int and isinstance(value, bool))):
+            raise ValueError(f"'{key}' must be a {expected.__name__}.")
+    if not all(isinstance(topic, str) for topic in payload.get("topics") or []):
+        raise ValueError("'topics' must be a list of topic names.")
+    lambda_function.resolve_topics(payload)
+    lambda_function.report_date(payload)
+
+
+class WorkerService:
+    """
+    Runs report jobs from a JobQueue on a pool of worker threads sharing warm models and clients.
+    Args:
+        queue (JobQueue): Persistent job queue.
+        workers (int): Number of jobs run at once.
+        max_queued (int): Maximum number of queued jobs; further submissions are rejected.
+        llm, tavily, notion: Clients shared by all jobs. Default to the live clients.
+    """
+
+    def __init__(self, queue, workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 llm=None, tavily=None, notion=None):
+        self.queue = queue
+        self.workers = workers
+        self.max_queued = max_queued
+        self.llm = llm
+        self.tavily = tavily
+        self.notion = notion
+        self.started_at = None
+        self.running = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Semaphore(0)
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """
+        Loads the models and clients, re-queues interrupted jobs and starts the workers.
+        """
+        timings = registry.warm_up()
+        print(f"Model timings: {timings}")
+        self.llm = self.llm or lambda_function.default_llm()
+        self.tavily = self.tavily or lambda_function.default_tavily()
+        self.notion = self.notion or get_notion_client()
+
+        requeued = self.queue.requeue_running()
+        if requeued:
+            print(f"Re-queued {requeued} interrupted jobs")
+        self.started_at = time.time()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stops taking jobs and waits for the running ones to finish.
+        """
+        self._stopping.set()
+        for _ in self._threads:
+            self._wakeup.release()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, payload):
+        """
+        Validates and queues a job.
+        Returns:
+            int: The job id.
+        Raises:
+            ValueError: If the payload is invalid.
+            QueueFull: If `max_queued` jobs are already waiting.
+        """
+        validate_job(payload)
+        with self._lock:
+            if self.queue.counts()["queued"] >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"{self.max_queued} jobs are already queued.")
+            job_id = self.queue.submit(payload)
+        self._wakeup.release()
+        return job_id
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.acquire(timeout=POLL_SECONDS)
+                continue
+            job_id, payload = job
+            with self._lock:
+                self.running += 1
+            print(f"Job {job_id} started: {payload}")
+            try:
+                result = lambda_function.run(payload, llm=self.llm, tavily=self.tavily, notion=self.notion)
+                self.queue.finish(job_id, {"reports": result["reports"], "metrics": result["metrics"]})
+                print(f"Job {job_id} done: {result['reports']}")
+            except Exception as e:
+                traceback.print_exc()
+                self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+    def health(self):
+        """
+        Returns the service health; 'ok' when the models are loaded and every worker is alive.
+        """
+        alive = sum(thread.is_alive() for thread in self._threads)
+        models = {name: registry.is_loaded(name) for name in registry.specs}
+        healthy = not self._stopping.is_set() and alive == self.workers and all(models.values())
+        return {"status": "ok" if healthy else "unavailable", "workers_alive": alive, "models_loaded": models}
+
+    def stats(self):
+        """
+        Returns job counts, admission and throughput figures of the service.
+        """
+        now = time.time()
+        uptime = now - self.started_at if self.started_at else 0.0
+        last_hour, mean_seconds = self.queue.finished_since(now - 3600)
+        since_start, _ = self.queue.finished_since(self.started_at or now)
+        with self._lock:
+            running, rejected = self.running, self.rejected
+        return {
+            "uptime_seconds": uptime,
+            "workers": self.workers,
+            "running": running,
+            "max_queued": self.max_queued,
+            "rejected": rejected,
+            "jobs": self.queue.counts(),
+            "finished_last_hour": last_hour,
+            "mean_job_seconds_last_hour": mean_seconds,
+            "jobs_per_hour": since_start / (uptime / 3600) if uptime else 0.0,
+            "model_timings": registry.report(),
+        }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front end of a WorkerService.
+    """
+
+    def __init__(self, service, *args, **kwargs):
+        self.service = service
+        super().__init__(*args, **kwargs)
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            health = self.service.health()
+            self._send(200 if health["status"] == "ok" else 503, health)
+        elif self.path == "/stats":
+            self._send(200, self.service.stats())
+        elif re.fullmatch(r"/jobs/\d+", self.path):
+            job = self.service.queue.get(int(self.path.rsplit("/", 1)[1]))
+            if job:
+                self._send(200, job)
+            else:
+                self._send(404, {"error": "Job not found."})
+        else:
+            self._send(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self._send(404, {"error": "Not found."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job_id = self.service.submit(json.loads(self.rfile.read(length) or b"{}"))
+        except QueueFull as e:
+            self._send(429, {"error": str(e)}, headers={"Retry-After": str(int(POLL_SECONDS * 12))})
+        except (ValueError, TypeError) as e:
+            # json.JSONDecodeError is a ValueError too.
+            self._send(400, {"error": str(e)})
+        else:
+            self._send(202, {"id": job_id, "status": "queued"})
+
+
+def make_server(service, host="127.0.0.1", port=8080):
+    """
+    Returns a threaded HTTP server exposing a WorkerService.
+    """
+    return ThreadingHTTPServer((host, port), partial(ServiceHandler, service))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (use an SSH tunnel to reach it).")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of jobs run at once.")
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_QUEUED, help="Queued jobs before new ones get 429.")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="SQLite job queue file.")
+    parser.add_argument("--backend", choices=["pytorch", "onnx"], help="NLP inference backend (default: NLP_BACKEND or pytorch).")
+    args = parser.parse_args()
+
+    if args.backend:
+        registry.set_backend(args.backend)
+    service = WorkerService(JobQueue(args.db), workers=args.workers, max_queued=args.max_queued)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    # SIGTERM (systemd stop) finishes the running jobs; queued jobs stay in the database.
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,255 @@
+"""
+This module keeps a persistent SQLite index of the articles processed by previous runs.
+It stores the processed entries of process_news_results with their content hash and the dates
+they were first and last seen, so weekly runs can annotate and report only new or changed
+articles and pull earlier items back as context.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from src.cache import content_hash
+from src.dedup import normalize_url
+
+ENTRY_FIELDS = (
+    "title", "summary", "entities", "sentiment", "sentiment_score",
+    "insights", "central_entities", "summary_len",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    raw_url TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    title TEXT,
+    summary TEXT,
+    entities TEXT,
+    sentiment TEXT,
+    sentiment_score REAL,
+    insights TEXT,
+    central_entities TEXT,
+    entity_runs TEXT,
+    summary_len INTEGER,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles (last_seen);
+CREATE INDEX IF NOT EXISTS idx_articles_first_seen ON articles (first_seen);
+CREATE TABLE IF NOT EXISTS article_topics (
+    url TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    section TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (url, topic)
+);
+CREATE INDEX IF NOT EXISTS idx_article_topics_section ON article_topics (topic, section, last_seen);
+"""
+# Columns added after the first version of the schema, with their SQL type.
+ADDED_COLUMNS = {"entity_runs": "TEXT"}
+
+
+def article_hash(result):
+    """
+    Returns the content hash of a Tavily result (title and content).
+    """
+    return content_hash(f"{result.get('title', '')}\n{result.get('content', '')}")
+
+
+class ArticleStore:
+    """
+    SQLite-backed index of processed articles, keyed by normalized URL. The section an article
+    was found in is kept per topic, so an article found by several topics serves as context
+    for each of them.
+    Args:
+        path (str): Database file.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(articles)")}
+            for name, sql_type in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE articles ADD COLUMN {name} {sql_type}")
+            if "topic" in existing:
+                # Earlier versions kept a single topic and section on the article row.
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO article_topics (url, topic, section, last_seen) "
+                    "SELECT url, topic, section, last_seen FROM articles WHERE topic IS NOT NULL"
+                )
+
+    def _to_entry(self, row):
+        entry = {field: row[field] for field in ENTRY_FIELDS}
+        entry.update(
+            entity_runs=json.loads(row["entity_runs"] or "[]"),
+            url=row["raw_url"],
+            content_hash=row["content_hash"],
+            first_seen=row["first_seen"],
+            last_seen=row["last_seen"],
+        )
+        return entry
+
+    def lookup(self, result):
+        """
+        Returns the stored entry of an article if it was processed before with the same content.
+        Args:
+            result (dict): Tavily result with 'url', 'title' and 'content'.
+        Returns:
+            dict: The stored entry, or None for new or changed articles.
+        """
+        if not (result.get("url") or "").strip():
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM articles WHERE url = ?", (normalize_url(result["url"]),)
+            ).fetchone()
+        if row is None or row["content_hash"] != article_hash(result):
+            return None
+        return self._to_entry(row)
+
+    def upsert(self, entry, topic, section, seen=None):
+        """
+        Inserts or updates a processed entry and the section it was found in for a topic.
+        first_seen and last_seen only move outwards, so a run dated in the past does not make
+        an article look older. Entries without a URL are not stored.
+        Args:
+            entry (dict): Processed entry with a 'content_hash' field.
+            topic (str): Report topic.
+            section (str): Section title.
+            seen (str): ISO date of the run. Defaults to today.
+        """
+        if not (entry.get("url") or "").strip():
+            return
+        seen = seen or datetime.now().strftime("%Y-%m-%d")
+        url = normalize_url(entry["url"])
+        values = {field: entry.get(field) for field in ENTRY_FIELDS}
+        values.update(
+            entity_runs=json.dumps(entry.get("entity_runs", [])),
+            url=url,
+            raw_url=entry["url"],
+            content_hash=entry["content_hash"],
+            first_seen=seen,
+            last_seen=seen,
+        )
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        updates = ", ".join(
+            f"{name} = excluded.{name}" for name in values if name not in ("url", "first_seen", "last_seen")
+        )
+        updates += ", first_seen = MIN(first_seen, excluded.first_seen), last_seen = MAX(last_seen, excluded.last_seen)"
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO articles ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(url) DO UPDATE SET {updates}",
+                values,
+            )
+            self._conn.execute(
+                "INSERT INTO article_topics (url, topic, section, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url, topic) DO UPDATE SET "
+                "section = CASE WHEN excluded.last_seen >= last_seen THEN excluded.section ELSE section END, "
+                "last_seen = MAX(last_seen, excluded.last_seen)",
+                (url, topic, section, seen),
+            )
+
+    def recent(self, topic, section, exclude_urls=(), limit=3):
+        """
+        Returns the most recently seen entries of a section.
+        Args:
+            topic (str): Report topic.
+            section (str): Section title.
+            exclude_urls (iterable): URLs to leave out (e.g. the entries already in the report).
+            limit (int): Maximum number of entries.
+        Returns:
+            list: Stored entries, most recent first.
+        """
+        excluded = {normalize_url(url) for url in exclude_urls}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT articles.* FROM article_topics JOIN articles ON articles.url = article_topics.url "
+                "WHERE article_topics.topic = ? AND article_topics.section = ? "
+                "ORDER BY article_topics.last_seen DESC LIMIT ?",
+                (topic, section, limit + len(excluded)),
+            ).fetchall()
+        return [self._to_entry(row) for row in rows if row["url"] not in excluded][:limit]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DeltaAnnotator:
+    """
+    Annotation step of delta mode: articles already in the store with unchanged content reuse
+    their stored entry, and only new or changed articles go through `annotate_fn`.
+    Every returned entry carries its 'content_hash' and an 'is_new' flag.
+    Args:
+        store (ArticleStore): Article index.
+        annotate_fn (callable): annotate_fn(results) -> processed entries.
+    """
+
+    def __init__(self, store, annotate_fn):
+        self.store = store
+        self.annotate_fn = annotate_fn
+        self.reused = 0
+        self.annotated = 0
+
+    def __call__(self, results):
+        entries = [self.store.lookup(result) for result in results]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        for i, entry in zip(missing, self.annotate_fn([results[i] for i in missing])):
+            entry["content_hash"] = article_hash(results[i])
+            entry["is_new"] = True
+            entries[i] = entry
+        for i, entry in enumerate(entries):
+            if "is_new" not in entry:
+                entry["is_new"] = False
+                entry["url"] = results[i].get("url", entry["url"])
+        self.reused += len(results) - len(missing)
+        self.annotated += len(missing)
+        return entries
+
+
+def delta_sections(sections, store, topic, context_per_section=1):
+    """
+    Keeps the new or changed entries of each section for the report. Sections with fewer than
+    `context_per_section` new entries are filled with already reported articles, first from this
+    run's search results and then from the store, marked with 'previously_reported'.
+    Args:
+        sections (list): Report sections ({'section_title', 'entries'}) of one topic.
+        store (ArticleStore): Article index.
+        topic (str): Report topic.
+        context_per_section (int): Minimum number of entries per section.
+    Returns:
+        tuple: (sections for the report, number of new entries).
+    """
+    selected = []
+    n_new = 0
+    for section in sections:
+        entries = [e for e in section["entries"] if e.get("is_new", True)]
+        n_new += len(entries)
+        missing = context_per_section - len(entries)
+        if missing > 0:
+            known = [e for e in section["entries"] if not e.get("is_new", True)]
+            known += store.recent(
+                topic, section["section_title"],
+                exclude_urls=[e["url"] for e in section["entries"]],
+                limit=missing,
+            )
+            for entry in known[:missing]:
+                entries.append(dict(entry, previously_reported=True))
+        if entries:
+            selected.append({"section_title": section["section_title"], "entries": entries})
+    return selected, n_new
@@ -0,0 +1,287 @@
+"""
+This module provides a persistent, content-addressed cache stored as JSON files on disk.
+It is meant to live in Lambda /tmp or on an EFS mount so search responses and NLP annotations
+survive between runs. Entries expire after a TTL and the oldest entries are evicted once the
+cache grows beyond a size bound. The total size of the entries is kept in a small file next to
+them, so opening the cache does not walk the directory.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from src.tracing import record
+
+DAY = 24 * 60 * 60
+# File holding the running total size of the entries.
+SIZE_FILE = "size"
+# The running size is saved once it drifts from the saved value by this fraction of max_bytes.
+SIZE_SAVE_FRACTION = 1 / 64
+# Eviction frees space down to this fraction of max_bytes, so the directory is only walked
+# again after that much has been written.
+EVICT_TARGET_FRACTION = 0.9
+
+
+def make_key(*parts):
+    """
+    Builds a stable cache key from JSON-serialisable parts.
+    Args:
+        *parts: Values that identify the cached item.
+    Returns:
+        str: SHA-256 hex digest of the parts.
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def content_hash(text):
+    """
+    Returns the SHA-256 hex digest of a text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    JSON file cache with per-entry TTL and least-recently-used eviction.
+    Args:
+        path (str): Directory holding the cache files.
+        max_bytes (int): Size bound; above it, the least recently used entries are removed
+            until the cache is back to EVICT_TARGET_FRACTION of it.
+        default_ttl (int): Time to live in seconds for entries stored without an explicit TTL.
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, default_ttl=7 * DAY):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        # None until the first write when no size was saved; it is then computed from the files.
+        self._size = self._load_size()
+        self._saved_size = self._size
+
+    def _file(self, namespace, key):
+        return os.path.join(self.path, namespace, f"{key}.json")
+
+    def _size_file(self):
+        return os.path.join(self.path, SIZE_FILE)
+
+    def _load_size(self):
+        try:
+            with open(self._size_file(), "r", encoding="utf-8") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save_size(self):
+        with self._lock:
+            size = self._size
+        if size is None:
+            return
+        tmp_path = f"{self._size_file()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(size))
+        os.replace(tmp_path, self._size_file())
+        with self._lock:
+            self._saved_size = size
+
+    def _ensure_size(self):
+        if self._size is not None:
+            return
+        scanned = sum(size for _, _, size in self._entries())
+        with self._lock:
+            if self._size is None:
+                self._size = scanned
+                self._saved_size = None
+
+    def _entries(self):
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                yield file_path, stat.st_mtime, stat.st_size
+
+    def _count(self, namespace, outcome):
+        record(**{f"cache_{outcome}": 1})
+        with self._lock:
+            counters = self.stats.setdefault(namespace, {"hits": 0, "misses": 0})
+            counters[outcome] += 1
+
+    def _remove(self, file_path):
+        try:
+            size = os.path.getsize(file_path)
+            os.remove(file_path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def get(self, namespace, key, count=True):
+        """
+        Returns the cached value, or None when it is missing or expired.
+        Args:
+            namespace (str): Logical group of entries, e.g. 'search' or 'annotations'.
+            key (str): Entry key, usually built with make_key.
+            count (bool): Count the lookup in the hit/miss stats. False for a repeated lookup
+                of a request that was already counted.
+        Returns:
+            The cached value or None.
+        """
+        file_path = self._file(namespace, key)
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            if count:
+                self._count(namespace, "misses")
+            return None
+
+        if record["expires_at"] < time.time():
+            self._remove(file_path)
+            if count:
+                self._count(namespace, "misses")
+            return None
+
+        # Touch the file so eviction follows recency of use.
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            pass
+        if count:
+            self._count(namespace, "hits")
+        return record["value"]
+
+    def set(self, namespace, key, value, ttl=None):
+        """
+        Stores a JSON-serialisable value.
+        Args:
+            namespace (str): Logical group of entries.
+            key (str): Entry key.
+            value: JSON-serialisable value.
+            ttl (int): Time to live in seconds. Defaults to the cache default.
+        """
+        self._ensure_size()
+        file_path = self._file(namespace, key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        record = {"expires_at": time.time() + (ttl or self.default_ttl), "value": value}
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        self._commit(tmp_path, file_path)
+
+    def writer(self, namespace, key, field, ttl=None):
+        """
+        Starts an entry whose value is a dict with a text `field` written in pieces.
+        Args:
+            namespace (str): Logical group of entries.
+            key (str): Entry key.
+            field (str): Name of the text field written with CacheWriter.write.
+            ttl (int): Time to live in seconds. Defaults to the cache default.
+        Returns:
+            CacheWriter: Writer of the entry; it is stored only when committed.
+        """
+        self._ensure_size()
+        return CacheWriter(self, self._file(namespace, key), field, time.time() + (ttl or self.default_ttl))
+
+    def _commit(self, tmp_path, file_path):
+        # Moves a fully written entry into place and accounts for its size.
+        previous = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, file_path)
+
+        with self._lock:
+            self._size += size - previous
+            over_budget = self._size > self.max_bytes
+            unsaved = self._saved_size is None or abs(self._size - self._saved_size) > self.max_bytes * SIZE_SAVE_FRACTION
+        if over_budget:
+            self.evict()
+        elif unsaved:
+            self._save_size()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is back to EVICT_TARGET_FRACTION
+        of its size bound. Expired entries are dropped lazily when they are read. The running size
+        is reset from the files, which also corrects the drift left by other processes sharing the
+        cache. Writes that overflow while another thread is evicting leave it to that thread.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            with self._lock:
+                self._size = sum(size for _, _, size in entries)
+            target = self.max_bytes * EVICT_TARGET_FRACTION
+            for file_path, _, _ in entries:
+                if self._size <= target:
+                    break
+                self._remove(file_path)
+            self._save_size()
+        finally:
+            self._evict_lock.release()
+
+    def flush(self):
+        """
+        Saves the running size, so the next process opening the cache starts from it.
+        """
+        self._save_size()
+
+    def report(self):
+        """
+        Returns the hit/miss counters per namespace.
+        """
+        with self._lock:
+            return {namespace: dict(counters) for namespace, counters in self.stats.items()}
+
+
+class CacheWriter:
+    """
+    Writes a cache entry whose text field arrives in pieces (e.g. a streamed LLM response)
+    straight to a temporary file, so the text is never held in memory as a whole.
+    The entry becomes visible on commit() and is discarded by abort().
+    """
+
+    def __init__(self, cache, file_path, field, expires_at):
+        self.cache = cache
+        self.file_path = file_path
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.tmp_path = f"{file_path}.{threading.get_ident()}.{id(self)}.tmp"
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write(f'{{"expires_at": {json.dumps(expires_at)}, "value": {{{json.dumps(field)}: "')
+
+    def write(self, text):
+        # The JSON string escaping of the piece, without its quotes.
+        self._file.write(json.dumps(text, ensure_ascii=False)[1:-1])
+
+    def commit(self, **fields):
+        """
+        Completes the entry with the other fields of its value and stores it.
+        """
+        self._file.write('"')
+        for name, value in fields.items():
+            self._file.write(f", {json.dumps(name)}: {json.dumps(value, ensure_ascii=False)}")
+        self._file.write("}}")
+        self._file.close()
+        self.cache._commit(self.tmp_path, self.file_path)
+
+    def abort(self):
+        """
+        Discards the entry.
+        """
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
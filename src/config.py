@@ -1,6 +1,7 @@
 """
 Configuration file for AI Weekly Report project.
-This file loads environment variables for API keys and checks their presence.
+This file loads environment variables for API keys. Their presence is checked with require_keys
+when a live client is created, so offline tools (benchmarks, tests) can import the package without them.
 """
 import os
 from dotenv import load_dotenv
@@ -12,7 +13,20 @@ TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
-assert OPENAI_API_KEY, "OPENAI_API_KEY is missing"
-assert TAVILY_API_KEY, "TAVILY_API_KEY is missing"
-assert NOTION_API_KEY, "NOTION_API_KEY is missing"
-assert NOTION_DATABASE_ID, "NOTION_DATABASE_ID is missing"
+# Persistent cache for search results and NLP annotations (Lambda /tmp or an EFS mount).
+CACHE_DIR = os.getenv("AI_RADAR_CACHE_DIR", "/tmp/ai-radar-cache")
+CACHE_MAX_BYTES = int(os.getenv("AI_RADAR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# SQLite index of the articles processed by previous runs, used by delta mode.
+ARTICLE_DB_PATH = os.getenv("AI_RADAR_ARTICLE_DB", os.path.join(CACHE_DIR, "articles.sqlite"))
+# SQLite job queue of the resident worker service (service.py).
+JOBS_DB_PATH = os.getenv("AI_RADAR_JOBS_DB", os.path.join(CACHE_DIR, "jobs.sqlite"))
+
+
+def require_keys(*names):
+    """
+    Checks that the given settings are present.
+    Args:
+        *names (str): Setting names, e.g. 'OPENAI_API_KEY'.
+    """
+    for name in names:
+        assert globals().get(name), f"{name} is missing"
@@ -0,0 +1,131 @@
+"""
+This module removes duplicate articles across query sections before NLP processing.
+Articles are matched by normalized URL first and then by SimHash signatures of their content,
+which catches syndicated or re-published copies of the same text.
+"""
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Click and campaign identifiers, besides utm_*. Parameters such as 'ref' or 'source' can select
+# content, so they are kept.
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+SIMHASH_BITS = 64
+# Four 16-bit bands: two signatures within 3 bits of each other share at least one band.
+SIMHASH_BANDS = 4
+MIN_SIMHASH_WORDS = 30
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL so that trivially different links to the same page compare equal.
+    Drops the scheme, 'www.', fragments, tracking parameters and trailing slashes, and maps
+    arXiv PDF and versioned links to the abstract page.
+    Args:
+        url (str): URL to normalize.
+    Returns:
+        str: Normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+
+    if host.endswith("arxiv.org"):
+        match = re.match(r"/(?:abs|pdf)/([^/]+?)(?:v\d+)?(?:\.pdf)?$", path)
+        if match:
+            path = f"/abs/{match.group(1)}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def _shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text):
+    """
+    Computes a 64-bit SimHash signature over word 3-shingles of a text.
+    Args:
+        text (str): Text to sign.
+    Returns:
+        int: The signature.
+    """
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class Deduplicator:
+    """
+    Streaming deduplicator that assigns each article to a canonical unique article.
+    Args:
+        max_distance (int): Maximum SimHash Hamming distance for two texts to count as near-duplicates.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.unique = []
+        self._by_url = {}
+        self._signatures = []
+        self._bands = {}
+
+    def _band_keys(self, signature):
+        width = SIMHASH_BITS // SIMHASH_BANDS
+        mask = (1 << width) - 1
+        return [(band, signature >> (band * width) & mask) for band in range(SIMHASH_BANDS)]
+
+    def _find_near_duplicate(self, signature):
+        for band_key in self._band_keys(signature):
+            for index in self._bands.get(band_key, ()):
+                if hamming_distance(signature, self._signatures[index]) <= self.max_distance:
+                    return index
+        return None
+
+    def add(self, result):
+        """
+        Registers an article and returns the index of its canonical unique article.
+        Args:
+            result (dict): Tavily result with 'url' and 'content'.
+        Returns:
+            tuple: (unique index, True if the article was not seen before).
+        """
+        # Articles without a URL are only matched by content.
+        url = normalize_url(result["url"]) if (result.get("url") or "").strip() else None
+        if url is not None and url in self._by_url:
+            return self._by_url[url], False
+
+        content = result.get("content", "")
+        signature = None
+        if len(content.split()) >= MIN_SIMHASH_WORDS:
+            signature = simhash(content)
+            index = self._find_near_duplicate(signature)
+            if index is not None:
+                if url is not None:
+                    self._by_url[url] = index
+                return index, False
+
+        index = len(self.unique)
+        self.unique.append(result)
+        self._signatures.append(signature)
+        if url is not None:
+            self._by_url[url] = index
+        if signature is not None:
+            for band_key in self._band_keys(signature):
+                self._bands.setdefault(band_key, []).append(index)
+        return index, True
@@ -0,0 +1,242 @@
+"""
+This module indexes the named entities of a whole run for centrality analysis.
+Entities are interned to integer ids and their co-occurrences are kept as NumPy arrays, so
+the per-article degree centrality of a batch and the run-wide degree and PageRank centrality
+are computed with vectorized array operations instead of one networkx graph per article.
+As in build_entity_graph, two entities co-occur when they are consecutive significant
+mentions in an article.
+"""
+import threading
+
+import numpy as np
+
+SIGNIFICANT_SCORE = 0.85
+DEFAULT_KEY_ACTORS = 10
+
+
+def entity_runs(entities_raw):
+    """
+    Splits the NER output of an article into runs of consecutive significant entities.
+    Args:
+        entities_raw (list): Named entities with 'word' and 'score', in text order.
+    Returns:
+        list: Runs of entity names; consecutive names of a run co-occur.
+    """
+    runs = [[]]
+    for ent in entities_raw:
+        if ent["score"] > SIGNIFICANT_SCORE:
+            runs[-1].append(ent["word"])
+        elif runs[-1]:
+            runs.append([])
+    return [run for run in runs if run]
+
+
+def _flatten(runs_list, intern):
+    """
+    Turns the runs of several articles into arrays of (article, entity id) mentions and
+    (article, entity id, entity id) co-occurrences.
+    """
+    node_art, node_ids, edge_art, edge_a, edge_b = [], [], [], [], []
+    for article, runs in enumerate(runs_list):
+        for run in runs:
+            ids = [intern(word) for word in run]
+            node_art.extend([article] * len(ids))
+            node_ids.extend(ids)
+            edge_art.extend([article] * (len(ids) - 1))
+            edge_a.extend(ids[:-1])
+            edge_b.extend(ids[1:])
+    return tuple(np.asarray(values, dtype=np.int64) for values in (node_art, node_ids, edge_art, edge_a, edge_b))
+
+
+def _article_degrees(n_vocab, node_art, node_ids, edge_art, edge_a, edge_b):
+    """
+    Computes the degree centrality of every (article, entity) node of a batch.
+    Returns:
+        tuple: (article of each node, entity id of each node, centrality of each node), grouped
+        by article with the nodes of an article in order of first mention.
+    """
+    # Unique nodes per article, kept in order of first mention.
+    node_keys = node_art * n_vocab + node_ids
+    unique_keys, first = np.unique(node_keys, return_index=True)
+    order = np.argsort(first, kind="stable")
+
+    # Unique undirected edges per article; a self-loop adds 2 to the degree, as in networkx.
+    lo, hi = np.minimum(edge_a, edge_b), np.maximum(edge_a, edge_b)
+    edge_keys = np.unique((edge_art * n_vocab + lo) * n_vocab + hi)
+    edge_art, rest = np.divmod(edge_keys, n_vocab * n_vocab)
+    lo, hi = np.divmod(rest, n_vocab)
+    endpoints = np.concatenate([edge_art * n_vocab + lo, edge_art * n_vocab + hi])
+    degree = np.bincount(np.searchsorted(unique_keys, endpoints), minlength=len(unique_keys))
+
+    articles, entities = np.divmod(unique_keys, n_vocab)
+    n_nodes = np.bincount(articles)[articles]
+    centrality = np.where(n_nodes > 1, degree / np.maximum(n_nodes - 1, 1), 1.0)
+    return articles[order], entities[order], centrality[order]
+
+
+def article_centralities(runs_list):
+    """
+    Computes the degree centrality of the entities of each article in one vectorized pass.
+    Args:
+        runs_list (list): Entity runs of each article (see entity_runs).
+    Returns:
+        list: For each article, (entity, centrality) pairs sorted by decreasing centrality;
+        ties keep the order of first mention.
+    """
+    vocab = {}
+    names = []
+
+    def intern(word):
+        if word not in vocab:
+            vocab[word] = len(names)
+            names.append(word)
+        return vocab[word]
+
+    arrays = _flatten(runs_list, intern)
+    results = [[] for _ in runs_list]
+    if not names:
+        return results
+    articles, entities, centrality = _article_degrees(len(names), *arrays)
+    bounds = np.searchsorted(articles, np.arange(len(runs_list) + 1))
+    for article in range(len(runs_list)):
+        start, end = bounds[article], bounds[article + 1]
+        ranked = start + np.argsort(-centrality[start:end], kind="stable")
+        results[article] = [(names[entities[i]], float(centrality[i])) for i in ranked]
+    return results
+
+
+def format_central_entities(centralities, top_n=3):
+    """
+    Formats the most central entities of an article for the 'central_entities' entry field.
+    """
+    return ", ".join(f"{entity} (centralidad={value:.2f})" for entity, value in centralities[:top_n])
+
+
+class EntityIndex:
+    """
+    Run-wide entity index with interned ids and a sparse co-occurrence matrix.
+    Articles are added in batches as they are annotated; the weight of a pair is the number
+    of articles in which the two entities co-occur.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.n_articles = 0
+        self._article_counts = np.zeros(0, dtype=np.int64)
+        self._pairs = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def _intern(self, word):
+        if word not in self.ids:
+            self.ids[word] = len(self.names)
+            self.names.append(word)
+        return self.ids[word]
+
+    def add(self, runs_list):
+        """
+        Adds the entity runs of a batch of articles to the index.
+        Args:
+            runs_list (list): Entity runs of each article (see entity_runs).
+        """
+        with self._lock:
+            node_art, node_ids, edge_art, edge_a, edge_b = _flatten(runs_list, self._intern)
+            n_vocab = max(len(self.names), 1)
+            self.n_articles += len(runs_list)
+
+            articles_of = np.unique(node_art * n_vocab + node_ids) % n_vocab
+            counts = np.bincount(articles_of, minlength=len(self.names))
+            counts[:len(self._article_counts)] += self._article_counts
+            self._article_counts = counts
+
+            lo, hi = np.minimum(edge_a, edge_b), np.maximum(edge_a, edge_b)
+            keep = lo != hi
+            pairs = np.unique((edge_art[keep] * n_vocab + lo[keep]) * n_vocab + hi[keep]) % (n_vocab * n_vocab)
+            if len(pairs):
+                self._pairs.append(np.stack(np.divmod(pairs, n_vocab)))
+            self._matrix = None
+
+    def add_entries(self, entries):
+        """
+        Adds processed entries to the index. Entries without 'entity_runs' (annotated by an
+        older version) contribute their entities without co-occurrences.
+        """
+        self.add([
+            entry.get("entity_runs") or [[e] for e in entry.get("entities", "").split(", ") if e]
+            for entry in entries
+        ])
+
+    def matrix(self):
+        """
+        Returns the symmetric co-occurrence matrix as a scipy.sparse CSR matrix.
+        """
+        from scipy import sparse
+
+        with self._lock:
+            if self._matrix is None:
+                n = len(self.names)
+                pairs = np.concatenate(self._pairs, axis=1) if self._pairs else np.zeros((2, 0), dtype=np.int64)
+                rows = np.concatenate([pairs[0], pairs[1]])
+                cols = np.concatenate([pairs[1], pairs[0]])
+                weights = np.ones(len(rows), dtype=np.float64)
+                # Duplicate pairs from different batches are summed by the conversion.
+                self._matrix = sparse.coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+            return self._matrix
+
+    def degree_centrality(self):
+        """
+        Returns the run-wide degree centrality of every entity: distinct co-occurring entities / (n - 1).
+        """
+        n = len(self.names)
+        if n <= 1:
+            return np.ones(n)
+        degree = np.diff(self.matrix().indptr)
+        return degree / (n - 1)
+
+    def pagerank(self, damping=0.85, tol=1e-8, max_iter=100):
+        """
+        Returns the PageRank of every entity over the weighted co-occurrence matrix, by power iteration.
+        Entities without co-occurrences spread their rank uniformly.
+        """
+        n = len(self.names)
+        if n == 0:
+            return np.zeros(0)
+        matrix = self.matrix()
+        out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+        transition = matrix.T.tocsr()
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            spread = transition @ (rank * inverse)
+            new_rank = damping * (spread + rank[dangling].sum() / n) + (1 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < n * tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def key_actors(self, top_n=DEFAULT_KEY_ACTORS):
+        """
+        Returns the most central entities of the run, ranked by PageRank. Ties are broken by
+        name, since entity ids depend on the order in which batches were annotated.
+        Returns:
+            list: Dicts with 'entity', 'pagerank', 'degree' and 'articles'.
+        """
+        if not self.names:
+            return []
+        pagerank = self.pagerank()
+        degree = self.degree_centrality()
+        # Rounded, so float noise from the summation order does not split ties.
+        top = np.lexsort((np.array(self.names), -np.round(pagerank, 8)))[:top_n]
+        return [
+            {
+                "entity": self.names[i],
+                "pagerank": float(pagerank[i]),
+                "degree": float(degree[i]),
+                "articles": int(self._article_counts[i]),
+            }
+            for i in top
+        ]
@@ -0,0 +1,162 @@
+"""
+This module runs the search, question-generation and annotation steps of a report as a pipeline.
+Network-bound calls (Tavily searches and LLM question generation) are fanned out to a bounded
+thread pool, while local NLP starts on the articles that have already arrived. Articles returned
+by several sections are annotated once and share the same entry.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.dedup import Deduplicator
+from src.tracing import in_context
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class SectionResult:
+    """
+    Collected output of one query section.
+    """
+
+    def __init__(self, section_title):
+        self.section_title = section_title
+        self.results = None
+        self.entries = None
+        self.questions = []
+        # Indices of the section's articles in the run-wide list of unique articles.
+        self.unique_indices = []
+        # Position in `results` of the first result of each unique article.
+        self.positions = []
+        # Generated question of each entry (None when there is none), aligned with `entries`.
+        self.entry_questions = []
+
+
+class PipelinedExecutor:
+    """
+    Runs the per-section search and question generation concurrently and annotates
+    articles in batches as soon as they arrive.
+    Args:
+        search_fn (callable): search_fn(query) -> list of Tavily results.
+        questions_fn (callable): questions_fn(results) -> list of generated questions; the question
+            at position i belongs to results[i].
+        annotate_fn (callable): annotate_fn(results) -> list of processed entries, one per result.
+        max_concurrency (int): Maximum number of network calls in flight.
+        batch_size (int): Number of arrived articles that triggers an annotation pass.
+        mode (str): 'threads' for the pipelined executor, 'sequential' for the one-by-one loop.
+        dedup (bool): Annotate articles shared by several sections (same URL or near-identical text) once.
+    """
+
+    def __init__(self, search_fn, questions_fn, annotate_fn,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, batch_size=8, mode="threads", dedup=True):
+        if mode not in ("threads", "sequential"):
+            raise ValueError(f"Unsupported executor mode '{mode}'.")
+        self.search_fn = search_fn
+        self.questions_fn = questions_fn
+        self.annotate_fn = annotate_fn
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_size = max(1, batch_size)
+        self.mode = mode
+        self.dedup = dedup
+        self.deduplicator = None
+        self.unique_entries = []
+
+    def _register(self, section, results):
+        """
+        Assigns the articles of a section to unique articles.
+        Returns:
+            list: (unique index, result) pairs for articles not seen before in this run.
+        """
+        section.results = results
+        new = []
+        for position, result in enumerate(results):
+            if self.dedup:
+                index, is_new = self.deduplicator.add(result)
+            else:
+                index, is_new = len(self.unique_entries), True
+            if is_new:
+                self.unique_entries.append(None)
+                new.append((index, result))
+            if index not in section.unique_indices:
+                section.unique_indices.append(index)
+                section.positions.append(position)
+        return new
+
+    def _annotate(self, items):
+        entries = self.annotate_fn([result for _, result in items])
+        for (index, _), entry in zip(items, entries):
+            self.unique_entries[index] = entry
+
+    def _finish(self, sections):
+        for section in sections:
+            section.entries = [self.unique_entries[index] for index in section.unique_indices]
+            # Questions follow their result, so duplicates dropped from a section do not shift them.
+            section.entry_questions = [
+                section.questions[position] if position < len(section.questions) else None
+                for position in section.positions
+            ]
+        return sections
+
+    def run(self, queries, on_section=None):
+        """
+        Processes every query section.
+        Args:
+            queries (dict): Mapping of section title to search query.
+            on_section (callable): Optional callback invoked with the section title when its search starts.
+        Returns:
+            list: SectionResult objects in the order of `queries`.
+        """
+        self.deduplicator = Deduplicator()
+        self.unique_entries = []
+        if self.mode == "sequential":
+            sections = self._run_sequential(queries, on_section)
+        else:
+            sections = self._run_pipelined(queries, on_section)
+        return self._finish(sections)
+
+    def _run_sequential(self, queries, on_section):
+        sections = []
+        for section_title, query in queries.items():
+            if on_section:
+                on_section(section_title)
+            section = SectionResult(section_title)
+            new = self._register(section, self.search_fn(query))
+            section.questions = self.questions_fn(section.results)
+            self._annotate(new)
+            sections.append(section)
+        return sections
+
+    def _run_pipelined(self, queries, on_section):
+        sections = [SectionResult(title) for title in queries]
+        # Unique articles waiting for annotation, as (unique index, result).
+        pending = []
+
+        def annotate_pending():
+            batch = pending[:]
+            pending.clear()
+            self._annotate(batch)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {}
+            for index, (section_title, query) in enumerate(queries.items()):
+                if on_section:
+                    on_section(section_title)
+                futures[pool.submit(in_context(self.search_fn), query)] = ("search", index)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, index = futures.pop(future)
+                    if kind == "search":
+                        results = future.result()
+                        pending.extend(self._register(sections[index], results))
+                        futures[pool.submit(in_context(self.questions_fn), results)] = ("questions", index)
+                    else:
+                        sections[index].questions = future.result()
+
+                searches_left = any(kind == "search" for kind, _ in futures.values())
+                # Run CPU work on what has arrived while the remaining requests are in flight.
+                if len(pending) >= self.batch_size or (pending and not searches_left):
+                    annotate_pending()
+
+        if pending:
+            annotate_pending()
+        return sections
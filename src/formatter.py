@@ -1,43 +1,183 @@
 """
 Module for formatting articles and generating a report structure.
 """
-def format_articles_for_prompt(sections):
+import re
+from functools import lru_cache
+
+COMPACT_SUMMARY_CHARS = 200
+# Default material budget, well inside the gpt-4o-mini context once the template is added.
+DEFAULT_TOKEN_BUDGET = 24000
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text):
     """
-    Formate the articles for the prompt and generate a reference list.
+    Counts the tokens of a text with the local tiktoken tokenizer.
+    Falls back to a 4-characters-per-token estimate when tiktoken is not installed.
+    Args:
+        text (str): Text to measure.
+    Returns:
+        int: Number of tokens.
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def entry_value(entry):
+    """
+    Scores how much an entry is worth keeping in the prompt.
+    Strong sentiment, central entities, extracted insights and rich entity lists rank higher.
+    Args:
+        entry (dict): Processed news entry.
+    Returns:
+        float: Relevance score.
+    """
+    sentiment_strength = abs(entry.get("sentiment_score", 0.5) - 0.5) * 2
+    centralities = [float(c) for c in re.findall(r"centralidad=([\d.]+)", entry.get("central_entities", ""))]
+    n_insights = len([line for line in entry.get("insights", "").split("\n") if line.strip()])
+    n_entities = len([e for e in entry.get("entities", "").split(",") if e.strip()])
+    return sentiment_strength + max(centralities, default=0.0) + 0.5 * n_insights + 0.1 * min(n_entities, 10)
+
+
+def _render_entry(entry, ref_id, compact=False):
+    summary = entry["summary"]
+    if compact and len(summary) > COMPACT_SUMMARY_CHARS:
+        summary = summary[:COMPACT_SUMMARY_CHARS] + "..."
+
+    parts = [
+        f"\n[{ref_id}] Title: {entry['title']}",
+        f"\nSummary: {summary}",
+        f"\nEntity keys: {entry['entities']}",
+        f"\nCentral entity: {entry['central_entities']}",
+        f"\nLength summary: {entry['summary_len']} caracteres",
+        f"\nSentiment: {entry['sentiment']}",
+        f"\nInsights:\n{entry['insights']}",
+    ]
+    if entry.get("previously_reported"):
+        # Context pulled from the article store in delta mode.
+        parts.append(f"\nPreviously reported (first seen {entry.get('first_seen', 'earlier')})")
+
+    qa_questions = entry.get("qa_questions")
+    if qa_questions and not compact:
+        if isinstance(qa_questions, str):
+            qa_questions = [qa_questions]
+        parts.append("\nQ&A Highlights:")
+        parts.extend(f"\n- {qa}" for qa in qa_questions)
+
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _select_entries(sections, token_budget):
+    """
+    Chooses how each unique entry is rendered so that the material fits the token budget.
+    The lowest-value entries are compacted first (shorter summary, no Q&A) and dropped next.
+    Returns:
+        dict: Maps id(entry) to 'full', 'compact' or 'drop'.
+    """
+    unique = {}
+    headers_cost = 0
+    for section in sections:
+        headers_cost += count_tokens(f"\n### Tema: {section['section_title']}\n")
+        for entry in section["entries"]:
+            unique.setdefault(id(entry), entry)
+
+    modes = {key: "full" for key in unique}
+    if token_budget is None:
+        return modes
+
+    # Reference ids are not known yet; a fixed placeholder keeps the estimate close.
+    full_cost = {key: count_tokens(_render_entry(entry, 999)) for key, entry in unique.items()}
+    compact_cost = {key: count_tokens(_render_entry(entry, 999, compact=True)) for key, entry in unique.items()}
+    total = headers_cost + sum(full_cost.values())
+    ranked = sorted(unique, key=lambda key: entry_value(unique[key]))
+
+    for key in ranked:
+        if total <= token_budget:
+            return modes
+        total -= full_cost[key] - compact_cost[key]
+        modes[key] = "compact"
+
+    for key in ranked:
+        if total <= token_budget:
+            break
+        total -= compact_cost[key]
+        modes[key] = "drop"
+    return modes
+
+
+def build_prompt_material(sections, token_budget=None):
+    """
+    Builds the prompt material for the report, optionally within a token budget.
     Args:
         sections (list): List of sections, each containing a title and entries.
+        token_budget (int): Maximum number of prompt tokens for the material. None means no limit.
     Returns:
-        tuple: Formatted string for the prompt, reference list, and updated sections.
+        dict: 'material' (str), 'ref_list' (list of URLs), 'sections' (the updated sections),
+        'section_texts' (list of (section title, text)) and 'section_tokens' (tokens per section title).
     """
-    formatted = ""
+    modes = _select_entries(sections, token_budget)
     ref_list = []
-    ref_counter = 1
+    seen = {}
+    section_texts = []
 
     for section in sections:
-        formatted += f"\n### Tema: {section['section_title']}\n"
+        parts = []
         for entry in section["entries"]:
-            entry["ref_id"] = ref_counter
+            mode = modes[id(entry)]
+            if mode == "drop":
+                continue
+            if id(entry) in seen:
+                parts.append(f"\n[{seen[id(entry)]}] Title: {entry['title']} (see above)\n")
+                continue
+            ref_id = len(ref_list) + 1
+            seen[id(entry)] = ref_id
+            entry["ref_id"] = ref_id
             ref_list.append(entry["url"])
+            parts.append(_render_entry(entry, ref_id, compact=mode == "compact"))
 
-            formatted += f"""
-[{ref_counter}] Title: {entry['title']}
-Summary: {entry['summary']}
-Entity keys: {entry['entities']}
-Central entity: {entry['central_entities']}
-Length summary: {entry['summary_len']} caracteres
-Sentiment: {entry['sentiment']}
-Insights:
-{entry['insights']}"""
+        if parts:
+            section_texts.append((section["section_title"], "".join(parts)))
 
-            if "qa_questions" in entry and entry["qa_questions"]:
-                formatted += "\nQ&A Highlights:"
-                for qa in entry["qa_questions"]:
-                    formatted += f"\n- {qa}"
+    material = "".join(
+        f"\n### Tema: {title}\n{text}" for title, text in section_texts
+    ).strip()
 
-            formatted += "\n"
-            ref_counter += 1
+    return {
+        "material": material,
+        "ref_list": ref_list,
+        "sections": sections,
+        "section_texts": section_texts,
+        "section_tokens": {title: count_tokens(text) for title, text in section_texts},
+    }
 
-    return formatted.strip(), ref_list, sections
+
+def format_articles_for_prompt(sections, token_budget=None):
+    """
+    Formate the articles for the prompt and generate a reference list.
+    An entry shared by several sections keeps a single reference id; later sections only
+    point back to it.
+    Args:
+        sections (list): List of sections, each containing a title and entries.
+        token_budget (int): Maximum number of prompt tokens for the material. None means no limit.
+    Returns:
+        tuple: Formatted string for the prompt, reference list, and updated sections.
+    """
+    built = build_prompt_material(sections, token_budget)
+    return built["material"], built["ref_list"], built["sections"]
 
 
 
@@ -51,8 +191,22 @@ def build_references_section(ref_list):
     """
     if not ref_list:
         return "## No references available.\n\n"
-    
-    ref_text = f"## References\n\n"
-    for i, url in enumerate(ref_list, start=1):
-        ref_text += f"[{i}] {url}\n"
-    return ref_text.strip()
+
+    lines = ["## References\n"]
+    lines.extend(f"[{i}] {url}" for i, url in enumerate(ref_list, start=1))
+    return "\n".join(lines).strip()
+
+
+def format_key_actors(key_actors):
+    """
+    Formats the run-wide key actors (see EntityIndex.key_actors) for the prompt.
+    Args:
+        key_actors (list): Dicts with 'entity', 'pagerank', 'degree' and 'articles'.
+    Returns:
+        str: One line per actor, or an empty string.
+    """
+    return "\n".join(
+        f"- {actor['entity']} (pagerank={actor['pagerank']:.3f}, centralidad={actor['degree']:.2f}, "
+        f"articles={actor['articles']})"
+        for actor in key_actors
+    )
@@ -1,6 +1,10 @@
 """
-This module provides functionality to generate articles using a language model and a Jinja2 template."""
+This module provides functionality to generate articles using a language model and a Jinja2 template.
+Articles can be generated from the full material in one call, or map-reduce style from per-section digests,
+and the final article can be streamed as it is generated."""
+from concurrent.futures import ThreadPoolExecutor
 from jinja2 import Template
+from src.tracing import in_context
 
 def load_prompt(path="prompts/ai_general_prompt.md"):
     """
@@ -25,7 +29,7 @@ def load_static_text(path):
         return f.read()
 
 
-def generate_article(llm, prompt_template, material, category_title, date):
+def generate_article(llm, prompt_template, material, category_title, date, key_actors=None):
     """
     Generates an article based on the provided material and category title.
     Args:
@@ -34,12 +38,107 @@ def generate_article(llm, prompt_template, material, category_title, date):
         material (str): The content to be included in the article.
         category_title (str): Title of the article category.
         date (str): Date of the report.
+        key_actors (str): Optional cross-section list of the most central entities.
     Returns:
         str: Generated article content.
     """
     rendered_prompt = prompt_template.render(
         category_title=category_title,
         date=date,
+        material=material,
+        key_actors=key_actors
+    )
+    return llm.invoke(rendered_prompt).content.strip()
+
+
+def stream_article(llm, prompt_template, material, category_title, date, key_actors=None):
+    """
+    Streams an article based on the provided material and category title.
+    Args:
+        llm: Language model instance with a `stream` method.
+        prompt_template (Template): Jinja2 template for the prompt.
+        material (str): The content to be included in the article.
+        category_title (str): Title of the article category.
+        date (str): Date of the report.
+        key_actors (str): Optional cross-section list of the most central entities.
+    Yields:
+        str: Pieces of the generated article, in order.
+    """
+    rendered_prompt = prompt_template.render(
+        category_title=category_title,
+        date=date,
+        material=material,
+        key_actors=key_actors
+    )
+    for chunk in llm.stream(rendered_prompt):
+        if chunk.content:
+            yield chunk.content
+
+
+def generate_section_digest(llm, digest_template, section_title, material, category_title, date):
+    """
+    Summarizes the material of a single section into a short digest.
+    Args:
+        llm: Language model instance for generating text.
+        digest_template (Template): Jinja2 template for the section prompt.
+        section_title (str): Title of the section.
+        material (str): The formatted material of the section.
+        category_title (str): Title of the article category.
+        date (str): Date of the report.
+    Returns:
+        str: Section digest.
+    """
+    rendered_prompt = digest_template.render(
+        category_title=category_title,
+        section_title=section_title,
+        date=date,
         material=material
     )
     return llm.invoke(rendered_prompt).content.strip()
+
+
+def digest_sections(llm, digest_template, section_texts, category_title, date, max_concurrency=4):
+    """
+    Summarizes every section by its own LLM call, run in parallel.
+    Args:
+        llm: Language model instance for generating text.
+        digest_template (Template): Jinja2 template for the per-section prompts.
+        section_texts (list): (section title, section material) pairs.
+        category_title (str): Title of the article category.
+        date (str): Date of the report.
+        max_concurrency (int): Maximum number of section calls in flight.
+    Returns:
+        str: The digests under one header per section, used as material of the final call.
+    """
+    def digest(item):
+        section_title, material = item
+        return generate_section_digest(llm, digest_template, section_title, material, category_title, date)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        digests = list(pool.map(in_context(digest), section_texts))
+
+    return "\n\n".join(
+        f"### Tema: {section_title}\n{section_digest}"
+        for (section_title, _), section_digest in zip(section_texts, digests)
+    )
+
+
+def generate_article_map_reduce(llm, prompt_template, digest_template, section_texts, category_title, date,
+                                max_concurrency=4, key_actors=None):
+    """
+    Generates an article in two steps: every section is summarized by its own LLM call,
+    run in parallel, and the digests are combined by a final call using the article template.
+    Args:
+        llm: Language model instance for generating text.
+        prompt_template (Template): Jinja2 template for the final article prompt.
+        digest_template (Template): Jinja2 template for the per-section prompts.
+        section_texts (list): (section title, section material) pairs.
+        category_title (str): Title of the article category.
+        date (str): Date of the report.
+        max_concurrency (int): Maximum number of section calls in flight.
+        key_actors (str): Optional cross-section list of the most central entities, given to the final call.
+    Returns:
+        str: Generated article content.
+    """
+    material = digest_sections(llm, digest_template, section_texts, category_title, date, max_concurrency)
+    return generate_article(llm, prompt_template, material, category_title, date, key_actors=key_actors)
@@ -0,0 +1,140 @@
+"""
+This module provides a persistent SQLite job queue for the report worker service.
+Jobs hold a report payload and move from 'queued' to 'running' to 'done' or 'failed';
+jobs left running by a stopped service are queued again when it restarts.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at);
+"""
+JOB_STATES = ("queued", "running", "done", "failed")
+
+
+class JobQueue:
+    """
+    SQLite-backed FIFO of report jobs, safe to share between threads.
+    Args:
+        path (str): Database file.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def submit(self, payload):
+        """
+        Queues a job.
+        Args:
+            payload (dict): Payload passed to lambda_function.run.
+        Returns:
+            int: The job id.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (payload, status, created_at) VALUES (?, 'queued', ?)",
+                (json.dumps(payload), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self):
+        """
+        Marks the oldest queued job as running.
+        Returns:
+            tuple: (job id, payload), or None when the queue is empty.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"])
+            )
+        return row["id"], json.loads(row["payload"])
+
+    def _close(self, job_id, status, result=None, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def finish(self, job_id, result):
+        self._close(job_id, "done", result=result)
+
+    def fail(self, job_id, error):
+        self._close(job_id, "failed", error=error)
+
+    def requeue_running(self):
+        """
+        Queues again the jobs that were running when the service stopped.
+        Returns:
+            int: Number of jobs queued again.
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'"
+            ).rowcount
+
+    def get(self, job_id):
+        """
+        Returns a job as a dict, or None if it does not exist.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self):
+        """
+        Returns the number of jobs in each state.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(JOB_STATES, 0)
+        counts.update({status: n for status, n in rows})
+        return counts
+
+    def finished_since(self, since):
+        """
+        Returns the number of jobs finished since a timestamp and their mean run time in seconds.
+        """
+        with self._lock:
+            n, mean = self._conn.execute(
+                "SELECT COUNT(*), AVG(finished_at - started_at) FROM jobs "
+                "WHERE status IN ('done', 'failed') AND finished_at >= ?",
+                (since,),
+            ).fetchone()
+        return n, mean or 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,186 @@
+"""
+This module wraps a LangChain chat model with a response cache.
+Responses are keyed by model name, temperature and a hash of the rendered prompt, stored in the
+persistent DiskCache, and concurrent identical requests inside the process share a single call.
+Streamed responses are written to the cache as they arrive and stored only once the stream is
+complete; a cached response is replayed as one chunk.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from src.cache import make_key, content_hash, DAY
+from src.tracing import record
+
+LLM_TTL = 30 * DAY
+
+
+class LLMResponse:
+    """
+    Minimal stand-in for a chat model message, exposing the fields the pipeline reads.
+    """
+
+    def __init__(self, content, total_tokens=0, latency=0.0):
+        self.content = content
+        self.total_tokens = total_tokens
+        self.latency = latency
+
+
+def _total_tokens(message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens", 0)
+
+
+class CachingLLM:
+    """
+    Chat model wrapper that reuses responses for identical prompts.
+    Only deterministic (temperature 0) models are cached; other calls pass straight through.
+    Args:
+        llm: LangChain chat model with an `invoke` method.
+        cache (DiskCache): Optional persistent cache. Without it only in-process deduplication applies.
+        ttl (int): Time to live of cached responses in seconds.
+    """
+
+    def __init__(self, llm, cache=None, ttl=LLM_TTL):
+        self.llm = llm
+        self.cache = cache
+        self.ttl = ttl
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", type(llm).__name__)
+        self.temperature = getattr(llm, "temperature", None)
+        self.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "deduplicated": 0,
+            "tokens_used": 0,
+            "tokens_saved": 0,
+            "latency_seconds": 0.0,
+            "latency_saved_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def __getattr__(self, attr):
+        return getattr(self.llm, attr)
+
+    def _record(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _call(self, prompt):
+        start = time.perf_counter()
+        message = self.llm.invoke(prompt)
+        latency = time.perf_counter() - start
+        response = LLMResponse(message.content, _total_tokens(message), latency)
+        self._record(calls=1, tokens_used=response.total_tokens, latency_seconds=latency)
+        record(llm_tokens=response.total_tokens)
+        return response
+
+    def _hit(self, cached):
+        # Counts a cache hit and returns the cached response.
+        self._record(cache_hits=1, tokens_saved=cached["total_tokens"], latency_saved_seconds=cached["latency"])
+        return LLMResponse(cached["content"], cached["total_tokens"], cached["latency"])
+
+    def invoke(self, prompt):
+        """
+        Returns the model response for a prompt, from cache when possible.
+        Args:
+            prompt (str): Rendered prompt.
+        Returns:
+            LLMResponse: Response with a `content` attribute, like a chat model message.
+        """
+        if self.temperature not in (0, 0.0):
+            return self._call(prompt)
+
+        key = make_key(self.model_name, self.temperature, content_hash(str(prompt)))
+        cached = self.cache.get("llm", key) if self.cache else None
+        if cached is not None:
+            return self._hit(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner and self.cache:
+                # An owner may have stored the response and left since the lookup above.
+                cached = self.cache.get("llm", key, count=False)
+            if owner and cached is None:
+                future = Future()
+                self._inflight[key] = future
+        if cached is not None:
+            return self._hit(cached)
+
+        if not owner:
+            response = future.result()
+            self._record(deduplicated=1, tokens_saved=response.total_tokens, latency_saved_seconds=response.latency)
+            return response
+
+        try:
+            response = self._call(prompt)
+            if self.cache:
+                self.cache.set("llm", key, {
+                    "content": response.content,
+                    "total_tokens": response.total_tokens,
+                    "latency": response.latency,
+                }, ttl=self.ttl)
+            future.set_result(response)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return response
+
+    def stream(self, prompt):
+        """
+        Streams the model response for a prompt, from cache when possible.
+        Streamed calls are not shared with concurrent identical requests.
+        Args:
+            prompt (str): Rendered prompt.
+        Yields:
+            LLMResponse: Pieces of the response; `total_tokens` is set on the last one.
+        """
+        cacheable = self.cache is not None and self.temperature in (0, 0.0)
+        key = make_key(self.model_name, self.temperature, content_hash(str(prompt)))
+        if cacheable:
+            cached = self.cache.get("llm", key)
+            if cached is not None:
+                yield self._hit(cached)
+                return
+
+        if not hasattr(self.llm, "stream"):
+            yield self._call(prompt)
+            return
+
+        start = time.perf_counter()
+        writer = self.cache.writer("llm", key, "content", ttl=self.ttl) if cacheable else None
+        total_tokens = 0
+        completed = False
+        try:
+            for chunk in self.llm.stream(prompt):
+                # Usage is reported on the last chunk (OpenAI) or spread over the chunks.
+                total_tokens += _total_tokens(chunk)
+                if writer:
+                    writer.write(chunk.content)
+                yield LLMResponse(chunk.content)
+            completed = True
+        finally:
+            # A failed or abandoned stream is not cached.
+            if writer and not completed:
+                writer.abort()
+        latency = time.perf_counter() - start
+        self._record(calls=1, tokens_used=total_tokens, latency_seconds=latency)
+        record(llm_tokens=total_tokens)
+        if writer:
+            writer.commit(total_tokens=total_tokens, latency=latency)
+        yield LLMResponse("", total_tokens, latency)
+
+    def report(self):
+        """
+        Returns the call, cache and savings counters of this run.
+        """
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,168 @@
+"""
+This module provides a lazy registry for the transformers pipelines used by the NLP stage.
+Each pipeline is built the first time it is requested and kept for the life of the process,
+so a warm Lambda container or long-running worker only pays the loading cost once.
+"""
+import os
+import threading
+import time
+
+BACKENDS = ("pytorch", "onnx")
+DEFAULT_BACKEND = os.getenv("NLP_BACKEND", "pytorch")
+
+MODEL_SPECS = {
+    "ner": {
+        "task": "ner",
+        "model": "dslim/bert-base-NER",
+        "kwargs": {"aggregation_strategy": "simple"},
+    },
+    "sentiment": {
+        "task": "sentiment-analysis",
+        "model": "distilbert-base-uncased-finetuned-sst-2-english",
+        "kwargs": {},
+    },
+    "qa": {
+        "task": "question-answering",
+        "model": "deepset/roberta-base-squad2",
+        "kwargs": {},
+    },
+}
+
+
+class TimedModel:
+    """
+    Thin wrapper around a pipeline that records the latency of its first call.
+    Calls are serialized by `lock`, since pipelines and their fast tokenizers are not safe to
+    use from several threads at once (e.g. concurrent jobs of the worker service).
+    Any other attribute access is forwarded to the wrapped pipeline.
+    """
+
+    def __init__(self, name, model, registry):
+        self._name = name
+        self._model = model
+        self._registry = registry
+        self._first_call_done = False
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            if self._first_call_done:
+                return self._model(*args, **kwargs)
+            start = time.perf_counter()
+            output = self._model(*args, **kwargs)
+            self._first_call_done = True
+            self._registry.timings[self._name]["first_inference_seconds"] = time.perf_counter() - start
+            return output
+
+    def __getattr__(self, attr):
+        return getattr(self._model, attr)
+
+
+class ModelRegistry:
+    """
+    Loads the NLP pipelines on demand and caches them for the life of the process.
+    Args:
+        specs (dict): Mapping of model name to its pipeline task, checkpoint and kwargs.
+        loader (callable): Factory called as loader(task, model=..., **kwargs). Defaults to the backend loader.
+        backend (str): 'pytorch' for stock transformers pipelines, 'onnx' for int8 ONNX Runtime models.
+    """
+
+    def __init__(self, specs=None, loader=None, backend=DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend '{backend}'.")
+        self.specs = specs or MODEL_SPECS
+        self.backend = backend
+        self._loader = loader
+        self._models = {}
+        self._locks = {name: threading.Lock() for name in self.specs}
+        self.timings = {}
+
+    def _load(self, name):
+        spec = self.specs[name]
+        loader = self._loader
+        if loader is None and self.backend == "onnx":
+            from src.onnx_backend import make_onnx_loader
+            loader = make_onnx_loader()
+        elif loader is None:
+            from transformers import pipeline
+            loader = pipeline
+
+        start = time.perf_counter()
+        model = loader(spec["task"], model=spec["model"], **spec["kwargs"])
+        self.timings[name] = {
+            "model": spec["model"],
+            "backend": self.backend,
+            "load_seconds": time.perf_counter() - start,
+            "first_inference_seconds": None,
+        }
+        return TimedModel(name, model, self)
+
+    def get(self, name):
+        """
+        Returns the pipeline registered under `name`, loading it on first use.
+        Args:
+            name (str): One of the keys of the registry specs ('ner', 'sentiment', 'qa').
+        Returns:
+            callable: The loaded pipeline.
+        """
+        if name not in self.specs:
+            raise KeyError(f"Unknown model '{name}'.")
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def set_backend(self, backend):
+        """
+        Switches the inference backend. Models loaded with the previous backend are released, so
+        this is meant for process start-up (CLI flags, benchmarks), not for individual runs.
+        Args:
+            backend (str): 'pytorch' or 'onnx'.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend '{backend}'.")
+        if backend != self.backend:
+            self.backend = backend
+            self._models.clear()
+            self.timings.clear()
+
+    def revision(self):
+        """
+        Returns a string identifying the backend and checkpoints, used to key cached annotations.
+        """
+        models = ";".join(f"{name}={spec['model']}" for name, spec in sorted(self.specs.items()))
+        return f"{self.backend}:{models}"
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """
+        Pre-loads the given models (all of them by default) and returns the recorded timings.
+        Args:
+            names (list): Model names to load. Defaults to every registered model.
+        Returns:
+            dict: Load and first-inference timings per model.
+        """
+        for name in names or self.specs:
+            self.get(name)
+        return self.report()
+
+    def report(self):
+        """
+        Returns a copy of the startup and first-inference timings recorded so far.
+        """
+        return {name: dict(timing) for name, timing in self.timings.items()}
+
+
+registry = ModelRegistry()
+
+
+def get_model(name):
+    """
+    Returns a model from the default process-wide registry.
+    """
+    return registry.get(name)
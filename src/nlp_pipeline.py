@@ -1,24 +1,39 @@
 """
 This module processes news articles to extract insights, sentiment, named entities, and generates questions for further analysis.
+Models are loaded lazily through src.model_registry, so importing this module stays cheap.
+Long documents are processed in overlapping token windows per model (see src.windowing).
 """
-from transformers import pipeline
-from datetime import datetime
-import networkx as nx
-from IPython.display import Markdown, display
+from src.model_registry import get_model, registry
+from src.cache import make_key, content_hash, DAY
+from src.tracing import trace
+from src.entity_index import entity_runs, article_centralities, format_central_entities
+from src.windowing import WINDOW_SPECS, iter_window_batches, EntityMerger, AnswerMerger, SentimentMerger
 
-ner_model = pipeline("ner", model="dslim/bert-base-NER", aggregation_strategy="simple")
-sentiment_model = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-qa_model = pipeline("question-answering", model="deepset/roberta-base-squad2")
+_LEGACY_MODEL_NAMES = {
+    "ner_model": "ner",
+    "sentiment_model": "sentiment",
+    "qa_model": "qa",
+}
 
 qa_questions = [
-    "What political decision is mentioned?"
-    "Which actors are involved?"
-    "What impact does this news have on AI regulation?"
+    "What political decision is mentioned?",
+    "Which actors are involved?",
+    "What impact does this news have on AI regulation?",
 ]
 
+DEFAULT_BATCH_SIZE = 8
+ANNOTATION_TTL = 30 * DAY
+
+def __getattr__(name):
+    # Keeps `from src.nlp_pipeline import ner_model` working without loading at import time.
+    if name in _LEGACY_MODEL_NAMES:
+        return get_model(_LEGACY_MODEL_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def build_entity_graph(entities_raw):
     """
     Builds a graph of named entities from the raw NER output.
+    Kept for compatibility; the pipeline computes centrality with src.entity_index.
     Entities with a score above 0.85 are considered significant.
     Edges are created between consecutive entities in the text.
     Args:
@@ -26,6 +41,8 @@ def build_entity_graph(entities_raw):
     Returns:
         nx.Graph: A graph where nodes are entities and edges connect consecutive entities.
     """
+    import networkx as nx
+
     G = nx.Graph()
     for ent in entities_raw:
         if ent['score'] > 0.85:
@@ -70,56 +87,207 @@ Do not include generic or trivial questions.
     return questions[:n_questions]
 
 
-def process_news_results(results):
+def _run_batched(model, inputs, batch_size, size_of=len):
+    """
+    Runs a pipeline over a list of inputs in batches, grouping inputs of similar length.
+    Sorting by length keeps the padding added to each batch small; outputs are returned
+    in the original input order.
+    Args:
+        model: Pipeline to call.
+        inputs (list): Inputs accepted by the pipeline.
+        batch_size (int): Number of inputs per forward pass.
+        size_of (callable): Returns the length used to group an input.
+    Returns:
+        list: One pipeline output per input.
+    """
+    if not inputs:
+        return []
+    order = sorted(range(len(inputs)), key=lambda i: size_of(inputs[i]))
+    outputs = model([inputs[i] for i in order], batch_size=batch_size)
+    if isinstance(outputs, dict):
+        # The QA pipeline unwraps single-element lists.
+        outputs = [outputs]
+
+    restored = [None] * len(inputs)
+    for position, index in enumerate(order):
+        restored[index] = outputs[position]
+    return restored
+
+
+def _build_entry(result, entities_raw, sentiment_result, qa_outputs, runs, centralities):
+    """
+    Builds a processed entry from the raw model outputs of one article and the
+    degree centrality of its entities.
+    """
+    title = result.get("title", "")
+    content = result.get("content", "")
+    url = result.get("url", "")
+
+    summary = content[:500] + "..." if len(content) > 500 else content
+
+    # Named Entities
+    entities_clean = list(set([e['word'] for e in entities_raw if e['score'] > 0.85]))
+
+    # Sentiment
+    sentiment_label = sentiment_result['label']
+    sentiment_score = sentiment_result['score']
+    sentiment = f"{sentiment_label} (score={sentiment_score:.2f})"
+
+    # QA
+    qa_answers = []
+    for question, answer in zip(qa_questions, qa_outputs):
+        if answer["score"] > 0.4 and answer["answer"].strip():
+            qa_answers.append(f"- {question}: {answer['answer']}")
+
+    return {
+        "title": title,
+        "summary": summary,
+        "entities": ", ".join(entities_clean),
+        "sentiment": sentiment,
+        "sentiment_score": sentiment_score,
+        "insights": "\n".join(qa_answers),
+        "central_entities": format_central_entities(centralities),
+        "entity_runs": runs,
+        "summary_len": len(summary),
+        "url": url
+    }
+
+
+def _tokenizer_of(model):
+    """
+    Returns the tokenizer of a pipeline for window sizing, guarded by the model lock, or None.
+    """
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return None
+
+    def tokenize(text, **kwargs):
+        with model.lock:
+            return tokenizer(text, **kwargs)
+
+    return tokenize
+
+
+def _windowed_ner(texts, batch_size):
+    model = get_model("ner")
+    merger = EntityMerger(len(texts))
+    n_windows = 0
+    for windows in iter_window_batches(texts, _tokenizer_of(model), WINDOW_SPECS["ner"]):
+        outputs = _run_batched(model, [texts[w.doc][w.start:w.end] for w in windows], batch_size)
+        for window, entities in zip(windows, outputs):
+            merger.add(window, entities)
+        n_windows += len(windows)
+    return merger.results(), n_windows
+
+
+def _windowed_sentiment(texts, batch_size):
+    model = get_model("sentiment")
+    merger = SentimentMerger(len(texts))
+    n_windows = 0
+    for windows in iter_window_batches(texts, _tokenizer_of(model), WINDOW_SPECS["sentiment"]):
+        outputs = _run_batched(model, [texts[w.doc][w.start:w.end] for w in windows], batch_size)
+        for window, output in zip(windows, outputs):
+            merger.add(window, output)
+        n_windows += len(windows)
+    return merger.results(), n_windows
+
+
+def _windowed_qa(texts, batch_size):
+    model = get_model("qa")
+    merger = AnswerMerger(len(texts), len(qa_questions))
+    n_windows = 0
+    for windows in iter_window_batches(texts, _tokenizer_of(model), WINDOW_SPECS["qa"]):
+        inputs = [
+            {"question": question, "context": texts[w.doc][w.start:w.end]}
+            for w in windows
+            for question in qa_questions
+        ]
+        outputs = _run_batched(model, inputs, batch_size, size_of=lambda x: len(x["context"]))
+        for i, answer in enumerate(outputs):
+            merger.add(windows[i // len(qa_questions)], i % len(qa_questions), answer)
+        n_windows += len(windows)
+    return merger.results(), n_windows
+
+
+def _annotate(results, batch_size):
+    """
+    Runs the NLP models over a list of articles. Every model sees the articles as overlapping
+    windows sized for it, sent in batched calls over a bounded buffer of windows.
+    """
+    texts = [f"{r.get('title', '')}\n{r.get('content', '')}" for r in results]
+
+    with trace("nlp.ner", items=len(texts)) as span:
+        entities_raw, n_windows = _windowed_ner(texts, batch_size)
+        span.add(windows=n_windows)
+    with trace("nlp.sentiment", items=len(texts)) as span:
+        sentiments, n_windows = _windowed_sentiment(texts, batch_size)
+        span.add(windows=n_windows)
+    with trace("nlp.qa", items=len(texts) * len(qa_questions)) as span:
+        qa_outputs, n_windows = _windowed_qa(texts, batch_size)
+        span.add(windows=n_windows)
+
+    with trace("entity_centrality", items=len(texts)):
+        runs = [entity_runs(entities) for entities in entities_raw]
+        centralities = article_centralities(runs)
+
+    return [
+        _build_entry(
+            result,
+            entities_raw[i],
+            sentiments[i],
+            qa_outputs[i],
+            runs[i],
+            centralities[i],
+        )
+        for i, result in enumerate(results)
+    ]
+
+
+def annotation_key(result):
+    """
+    Returns the cache key of an article's annotations: its text hash plus the model revision
+    and window settings.
+    """
+    text = f"{result.get('title', '')}\n{result.get('content', '')}"
+    return make_key(content_hash(text), registry.revision(), WINDOW_SPECS)
+
+
+def process_news_results(results, batch_size=DEFAULT_BATCH_SIZE, cache=None, pool=None):
     """
     Processes news results to extract insights, sentiment, and named entities.
+    All articles are sent through each model as a single batched call.
     Args:
         results (list): List of news articles with 'title', 'content', and 'url'.
+        batch_size (int): Number of inputs per forward pass of each model.
+        cache (DiskCache): Optional annotation cache; articles already seen skip inference.
+        pool (NLPWorkerPool): Optional process pool spreading inference over several cores.
     Returns:
         list: Processed results with insights, sentiment, named entities, and summaries.
     """
-    processed = []
-    for result in results:
-        title = result.get("title", "")
-        content = result.get("content", "")
-        url = result.get("url", "")
-        full_text = f"{title}\n{content}"
-
-        summary = content[:500] + "..." if len(content) > 500 else content
-
-        # Named Entities
-        entities_raw = ner_model(full_text)
-        entities_clean = list(set([e['word'] for e in entities_raw if e['score'] > 0.85]))
-
-        # Sentiment
-        sentiment_result = sentiment_model(full_text[:512])[0]
-        sentiment_label = sentiment_result['label']
-        sentiment_score = sentiment_result['score']
-        sentiment = f"{sentiment_label} (score={sentiment_score:.2f})"
-
-        # QA
-        qa_answers = []
-        for question in qa_questions:
-            answer = qa_model(question=question, context=full_text)
-            if answer["score"] > 0.4 and answer["answer"].strip():
-                qa_answers.append(f"- {question}: {answer['answer']}")
-
-        # Entity Graph
-        graph = build_entity_graph(entities_raw)
-        centrality = nx.degree_centrality(graph)
-        central_entities = sorted(centrality.items(), key=lambda x: -x[1])[:3]
-        central_summary = ", ".join([f"{e[0]} (centralidad={e[1]:.2f})" for e in central_entities])
-
-        processed.append({
-            "title": title,
-            "summary": summary,
-            "entities": ", ".join(entities_clean),
-            "sentiment": sentiment,
-            "sentiment_score": sentiment_score,
-            "insights": "\n".join(qa_answers),
-            "central_entities": central_summary,
-            "summary_len": len(summary),
-            "url": url
-        })
-
-    return processed
\ No newline at end of file
+    if not results:
+        return []
+
+    with trace("process_news_results", items=len(results)):
+        processed = [None] * len(results)
+        keys = [annotation_key(result) for result in results] if cache else []
+        if cache:
+            for i, key in enumerate(keys):
+                entry = cache.get("annotations", key)
+                if entry is not None:
+                    # The same text may be published under another URL.
+                    entry.update(title=results[i].get("title", ""), url=results[i].get("url", ""))
+                    processed[i] = entry
+
+        missing = [i for i, entry in enumerate(processed) if entry is None]
+        annotated = []
+        if missing and pool:
+            with trace("nlp.process_pool", items=len(missing)):
+                annotated = pool.annotate([results[i] for i in missing], batch_size)
+        elif missing:
+            annotated = _annotate([results[i] for i in missing], batch_size)
+        for i, entry in zip(missing, annotated):
+            processed[i] = entry
+            if cache:
+                cache.set("annotations", keys[i], entry, ttl=ANNOTATION_TTL)
+
+        return processed
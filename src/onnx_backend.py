@@ -0,0 +1,122 @@
+"""
+This module provides an ONNX Runtime inference backend for the NLP models.
+Each checkpoint is exported to ONNX once, dynamically quantized to int8 and cached on disk;
+the quantized graph then runs through ONNX Runtime behind the usual transformers pipeline
+interface, so the NER, sentiment and QA call sites do not change.
+Requires the optional `optimum[onnxruntime]` dependency (see requirements-onnx.txt).
+"""
+import os
+
+ORT_MODEL_CLASSES = {
+    "ner": "ORTModelForTokenClassification",
+    "token-classification": "ORTModelForTokenClassification",
+    "sentiment-analysis": "ORTModelForSequenceClassification",
+    "text-classification": "ORTModelForSequenceClassification",
+    "question-answering": "ORTModelForQuestionAnswering",
+}
+QUANTIZED_FILE = "model_quantized.onnx"
+DEFAULT_ONNX_DIR = os.getenv("AI_RADAR_ONNX_DIR", "/tmp/ai-radar-onnx")
+
+
+def _ort_class(task):
+    import optimum.onnxruntime as ort
+
+    return getattr(ort, ORT_MODEL_CLASSES[task])
+
+
+def export_model(task, model, output_dir=DEFAULT_ONNX_DIR, quantize=True):
+    """
+    Exports a checkpoint to ONNX and applies dynamic int8 quantization, unless already done.
+    Args:
+        task (str): Pipeline task of the model.
+        model (str): Hugging Face checkpoint id.
+        output_dir (str): Directory holding the exported models.
+        quantize (bool): Whether to produce the int8 quantized graph.
+    Returns:
+        tuple: (directory of the exported model, ONNX file name to load).
+    """
+    from transformers import AutoTokenizer
+
+    model_dir = os.path.join(output_dir, model.replace("/", "__"))
+    file_name = QUANTIZED_FILE if quantize else "model.onnx"
+    if os.path.exists(os.path.join(model_dir, file_name)):
+        return model_dir, file_name
+
+    ort_model = _ort_class(task).from_pretrained(model, export=True)
+    ort_model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(model).save_pretrained(model_dir)
+
+    if quantize:
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+        quantizer = ORTQuantizer.from_pretrained(model_dir)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=model_dir, quantization_config=config)
+    return model_dir, file_name
+
+
+def make_onnx_loader(output_dir=DEFAULT_ONNX_DIR, quantize=True):
+    """
+    Returns a loader compatible with ModelRegistry that builds ONNX Runtime pipelines.
+    Args:
+        output_dir (str): Directory holding the exported models.
+        quantize (bool): Whether to use the int8 quantized graphs.
+    Returns:
+        callable: loader(task, model=..., **kwargs) -> pipeline.
+    """
+    def loader(task, model=None, **kwargs):
+        from transformers import AutoTokenizer, pipeline
+
+        model_dir, file_name = export_model(task, model, output_dir=output_dir, quantize=quantize)
+        ort_model = _ort_class(task).from_pretrained(model_dir, file_name=file_name)
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        return pipeline(task, model=ort_model, tokenizer=tokenizer, **kwargs)
+
+    return loader
+
+
+def _entity_set(entities):
+    return {e["word"] for e in entities if e["score"] > 0.85}
+
+
+def compare_backends(texts, reference, candidate, questions=None):
+    """
+    Measures how closely a candidate backend reproduces the reference outputs.
+    Args:
+        texts (list): Article texts to annotate.
+        reference (ModelRegistry): Registry with the reference backend.
+        candidate (ModelRegistry): Registry with the backend under test.
+        questions (list): QA questions to ask on every text.
+    Returns:
+        dict: Mean NER entity-set Jaccard similarity, sentiment label agreement and mean absolute
+        score difference, and QA answer exact-match rate.
+    """
+    from src.nlp_pipeline import qa_questions
+
+    questions = questions or qa_questions
+    outputs = {}
+    for name, registry in (("reference", reference), ("candidate", candidate)):
+        outputs[name] = {
+            "ner": registry.get("ner")(texts),
+            "sentiment": registry.get("sentiment")([t[:512] for t in texts]),
+            "qa": [registry.get("qa")(question=q, context=t) for t in texts for q in questions],
+        }
+
+    ref, cand = outputs["reference"], outputs["candidate"]
+    jaccard = []
+    for a, b in zip(ref["ner"], cand["ner"]):
+        set_a, set_b = _entity_set(a), _entity_set(b)
+        jaccard.append(len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 1.0)
+
+    label_agreement = [a["label"] == b["label"] for a, b in zip(ref["sentiment"], cand["sentiment"])]
+    score_diff = [abs(a["score"] - b["score"]) for a, b in zip(ref["sentiment"], cand["sentiment"])]
+    qa_match = [a["answer"].strip() == b["answer"].strip() for a, b in zip(ref["qa"], cand["qa"])]
+
+    return {
+        "texts": len(texts),
+        "ner_jaccard": sum(jaccard) / len(jaccard),
+        "sentiment_label_agreement": sum(label_agreement) / len(label_agreement),
+        "sentiment_mean_abs_score_diff": sum(score_diff) / len(score_diff),
+        "qa_exact_match": sum(qa_match) / len(qa_match),
+    }
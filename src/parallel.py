@@ -0,0 +1,95 @@
+"""
+This module runs NLP annotation on several CPU cores with a pool of forked worker processes.
+The models are loaded once in the parent before the workers are forked, so every worker shares
+the weights copy-on-write instead of loading its own copy. Each worker limits its intra-op
+threads so processes and torch threads together do not oversubscribe the cores.
+Stage timings recorded in a worker are sent back with its entries and added to the run's tracer.
+"""
+import multiprocessing
+import os
+import sys
+
+from src.model_registry import registry
+from src.tracing import Tracer, get_tracer, set_tracer
+
+
+def _init_worker(intra_op_threads):
+    os.environ["OMP_NUM_THREADS"] = str(intra_op_threads)
+    os.environ["MKL_NUM_THREADS"] = str(intra_op_threads)
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(intra_op_threads)
+
+
+def _annotate_chunk(args):
+    # Runs in a worker: the registry and its loaded models were inherited from the parent.
+    # Spans are recorded on a tracer of the chunk and returned, since the parent's tracer
+    # cannot see what a worker records.
+    from src.nlp_pipeline import _annotate
+
+    chunk, batch_size = args
+    tracer = set_tracer(Tracer())
+    entries = _annotate(chunk, batch_size)
+    return entries, tracer.metrics()["stages"]
+
+
+class NLPWorkerPool:
+    """
+    Pool of forked processes annotating articles in parallel.
+    Create it before starting any threads, since forking a multi-threaded process is unsafe.
+    Args:
+        workers (int): Number of worker processes.
+        intra_op_threads (int): Threads per worker for torch/BLAS. Defaults to cores / workers.
+    """
+
+    def __init__(self, workers, intra_op_threads=None):
+        if registry.backend == "onnx":
+            # ONNX Runtime sessions do not survive fork(); their thread pools are not re-created.
+            raise ValueError("The process-pool mode requires the pytorch backend.")
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("The process-pool mode requires the 'fork' start method.")
+
+        self.workers = workers
+        self.intra_op_threads = intra_op_threads or max(1, (os.cpu_count() or 1) // workers)
+        # Load every model in the parent so the workers share the weights copy-on-write.
+        registry.warm_up()
+        context = multiprocessing.get_context("fork")
+        self._pool = context.Pool(workers, initializer=_init_worker, initargs=(self.intra_op_threads,))
+
+    def annotate(self, results, batch_size):
+        """
+        Annotates articles across the workers.
+        Args:
+            results (list): Articles to annotate.
+            batch_size (int): Batch size used by each worker.
+        Returns:
+            list: Processed entries, in the order of `results`.
+        """
+        if not results:
+            return []
+        # One model batch per chunk, handed to whichever worker is free: callers should send at
+        # least `workers * batch_size` articles (see batch_articles) to keep every worker busy.
+        chunks = [(results[i:i + batch_size], batch_size) for i in range(0, len(results), batch_size)]
+        entries = []
+        tracer = get_tracer()
+        for chunk_entries, stages in self._pool.map(_annotate_chunk, chunks, chunksize=1):
+            entries.extend(chunk_entries)
+            tracer.merge(stages)
+        return entries
+
+    def batch_articles(self, batch_size):
+        """
+        Returns the number of articles to collect before annotating: a full model batch per worker.
+        """
+        return self.workers * batch_size
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,248 @@
+"""
+This module records stage-level metrics for a report run.
+Each stage tracks wall time, CPU time, growth of the peak RSS, item counts, LLM token usage
+and cache hits.
+At the end of a run the metrics are available as a JSON document and as CloudWatch
+embedded-metric-format (EMF) log lines.
+The current tracer is held in a context variable, so concurrent runs in one process
+(e.g. the worker service) each report to their own tracer.
+"""
+import contextvars
+import json
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS = [
+    ("Calls", "calls", "Count"),
+    ("WallTime", "wall_seconds", "Seconds"),
+    ("CpuTime", "cpu_seconds", "Seconds"),
+    ("PeakRssGrowth", "peak_rss_growth_mb", "Megabytes"),
+    ("Items", "items", "Count"),
+    ("LlmTokens", "llm_tokens", "Count"),
+    ("CacheHits", "cache_hits", "Count"),
+    ("CacheMisses", "cache_misses", "Count"),
+]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Span:
+    """
+    Counters of one stage execution. Extra counts can be added while the stage runs.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {"items": 0, "llm_tokens": 0, "cache_hits": 0, "cache_misses": 0}
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+class Tracer:
+    """
+    Aggregates stage metrics for a run. Stages with the same name are summed, except
+    peak_rss_growth_mb: how much one execution of the stage raised the process's peak RSS, kept
+    as the largest value over its executions. CPU time is measured on the calling thread, so
+    concurrent stages do not count each other; peak RSS is process-wide, so a stage running
+    alongside others may be charged for their memory too.
+    Args:
+        namespace (str): CloudWatch metrics namespace.
+        dimensions (dict): Dimension values attached to every metric (e.g. the report topic).
+    """
+
+    def __init__(self, namespace="AIRadar", dimensions=None):
+        self.namespace = namespace
+        self.dimensions = dimensions or {}
+        self.stages = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """
+        Measures a block of code as a stage.
+        Args:
+            name (str): Stage name.
+            items (int): Number of items processed by the stage.
+        Yields:
+            Span: Counters that can be increased while the stage runs.
+        """
+        span = Span(name)
+        span.add(items=items)
+        stack = self._stack()
+        stack.append(span)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        rss_start = _peak_rss_mb()
+        try:
+            yield span
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            rss_growth = _peak_rss_mb() - rss_start
+            stack.pop()
+            self._record(span, wall, cpu, rss_growth)
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {
+            "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_growth_mb": 0.0,
+            "items": 0, "llm_tokens": 0, "cache_hits": 0, "cache_misses": 0,
+        })
+
+    def _record(self, span, wall, cpu, rss_growth):
+        with self._lock:
+            stage = self._stage(span.name)
+            stage["calls"] += 1
+            stage["wall_seconds"] += wall
+            stage["cpu_seconds"] += cpu
+            stage["peak_rss_growth_mb"] = max(stage["peak_rss_growth_mb"], rss_growth)
+            for key, value in span.counters.items():
+                stage[key] = stage.get(key, 0) + value
+
+    def record(self, **counts):
+        """
+        Adds counts (e.g. llm_tokens, cache_hits) to the innermost stage running on this thread.
+        Counts recorded outside any stage are ignored.
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1].add(**counts)
+
+    def merge(self, stages):
+        """
+        Adds stage metrics recorded by another tracer, e.g. in a worker process.
+        Args:
+            stages (dict): The 'stages' of the other tracer's metrics.
+        """
+        with self._lock:
+            for name, values in stages.items():
+                stage = self._stage(name)
+                for key, value in values.items():
+                    if key == "peak_rss_growth_mb":
+                        stage[key] = max(stage[key], value)
+                    else:
+                        stage[key] = stage.get(key, 0) + value
+
+    def metrics(self):
+        """
+        Returns the metrics document of the run.
+        """
+        with self._lock:
+            stages = {name: dict(values) for name, values in self.stages.items()}
+        return {
+            "namespace": self.namespace,
+            "dimensions": dict(self.dimensions),
+            "started_at": self.started_at,
+            "duration_seconds": time.time() - self.started_at,
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": stages,
+        }
+
+    def emf_lines(self):
+        """
+        Returns one CloudWatch embedded-metric-format JSON line per stage.
+        """
+        timestamp = int(time.time() * 1000)
+        dimension_names = list(self.dimensions) + ["Stage"]
+        lines = []
+        for name, values in self.metrics()["stages"].items():
+            record = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [dimension_names],
+                        "Metrics": [
+                            {"Name": metric, "Unit": unit}
+                            for metric, _, unit in METRICS
+                        ],
+                    }],
+                },
+                **self.dimensions,
+                "Stage": name,
+            }
+            for metric, key, _ in METRICS:
+                record[metric] = values[key]
+            lines.append(json.dumps(record))
+        return lines
+
+    def emit(self, metrics_path=None, extra=None):
+        """
+        Prints the EMF lines (picked up by CloudWatch Logs on Lambda) and optionally writes
+        the JSON metrics document to a file.
+        Args:
+            metrics_path (str): Optional path of the JSON metrics document.
+            extra (dict): Run-level information merged into the document.
+        Returns:
+            dict: The metrics document.
+        """
+        for line in self.emf_lines():
+            print(line)
+        document = self.metrics()
+        document.update(extra or {})
+        if metrics_path:
+            with open(metrics_path, "w") as f:
+                json.dump(document, f, indent=2)
+        return document
+
+
+_default_tracer = Tracer()
+_current_tracer = contextvars.ContextVar("tracer", default=None)
+
+
+def get_tracer():
+    """
+    Returns the tracer of the current run, or the process-wide default outside of a run.
+    """
+    return _current_tracer.get() or _default_tracer
+
+
+def set_tracer(tracer):
+    """
+    Sets the tracer of the current run, typically a fresh one at the start of the run.
+    The tracer applies to the calling thread and to work submitted through `in_context`.
+    """
+    _current_tracer.set(tracer)
+    return tracer
+
+
+def in_context(fn):
+    """
+    Wraps a function submitted to a thread pool so it runs with the caller's tracer.
+    """
+    context = contextvars.copy_context()
+
+    def call(*args, **kwargs):
+        # A context can only be entered by one thread at a time.
+        return context.copy().run(fn, *args, **kwargs)
+
+    return call
+
+
+def trace(name, items=0):
+    """
+    Shortcut for get_tracer().stage(name, items).
+    """
+    return get_tracer().stage(name, items)
+
+
+def record(**counts):
+    """
+    Shortcut for get_tracer().record(**counts).
+    """
+    get_tracer().record(**counts)
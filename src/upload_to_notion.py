@@ -1,107 +1,524 @@
 """
 This module provides functionality to upload Markdown content to a Notion database as a new page.
-It converts Markdown text into Notion blocks and creates a new page with the specified title."""
+It converts Markdown text into Notion blocks and creates a new page with the specified title.
+Long reports are uploaded in chunks: the page is created with the first blocks and the rest are
+appended through the block-children API, under a token-bucket rate limit with retries.
+Page creation and block appends are not idempotent: they are resent directly only when Notion
+rejected them (429, 503); after a timeout or another server error the page is read back first,
+so a request Notion applied anyway is not applied twice.
+Streamed reports are published while they are generated: the page is created first and blocks
+are appended in small batches as the incremental parser closes them. If generation or upload
+fails, the page gets a closing "generation failed" callout, or is archived."""
+import queue
+import random
 import re
 import os
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from notion_client import Client
-from src.config import NOTION_API_KEY, NOTION_DATABASE_ID
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+from src.config import NOTION_API_KEY, NOTION_DATABASE_ID, require_keys
 
-notion = Client(auth=NOTION_API_KEY)
+# Notion accepts at most 100 child blocks per request and 2000 characters per text object.
+MAX_BLOCKS_PER_REQUEST = 100
+# Notion allows an average of three requests per second per integration.
+NOTION_REQUESTS_PER_SECOND = 3
+RETRYABLE_STATUS = {409, 429, 500, 502, 503, 504}
+# Statuses for which Notion did not apply the request, so a write can be sent again as is.
+REJECTED_STATUS = {429, 503}
+RETRY_BASE_DELAY = 1.0
+# A page created by a timed-out request may take a moment to show up in search.
+PAGE_LOOKUP_ATTEMPTS = 3
+# Streamed blocks are appended in batches of this size, or earlier when the stream is slow.
+STREAM_BATCH_BLOCKS = 10
+STREAM_FLUSH_SECONDS = 2.0
+FAILURE_NOTICE = "Generation failed: this report is incomplete."
 
-def markdown_to_blocks(markdown_text, chunk_limit=1800):
+_notion = None
+
+
+def get_notion_client():
     """
-    Convert Markdown text to Notion blocks.
-    This function processes Markdown text and converts it into a list of Notion blocks.
-    It handles headings, paragraphs, bulleted lists, and numbered references.
+    Returns the process-wide Notion client, creating it on first use.
+    """
+    global _notion
+    if _notion is None:
+        require_keys("NOTION_API_KEY", "NOTION_DATABASE_ID")
+        _notion = Client(auth=NOTION_API_KEY)
+    return _notion
+
+
+def split_text(text, chunk_limit):
+    """
+    Splits a text into chunks of at most `chunk_limit` characters, preferring whitespace boundaries.
     Args:
-        markdown_text (str): The Markdown text to convert.
-        chunk_limit (int): The maximum number of characters per block.
+        text (str): Text to split.
+        chunk_limit (int): Maximum number of characters per chunk.
     Returns:
-        list: A list of Notion blocks.
+        list: Text chunks, in order.
     """
-    lines = markdown_text.split("\n")
-    blocks = []
+    chunks = []
+    while len(text) > chunk_limit:
+        cut = text.rfind(" ", 0, chunk_limit + 1)
+        if cut <= 0:
+            cut = chunk_limit
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    chunks.append(text)
+    return chunks
+
+
+def _rich_text(text, chunk_limit):
+    return [{"type": "text", "text": {"content": chunk}} for chunk in split_text(text, chunk_limit)]
 
-    def add_paragraph(text):
-        return {
+
+def _paragraph_blocks(text, chunk_limit):
+    # Oversized paragraphs become several consecutive paragraph blocks.
+    return [
+        {
             "object": "block",
             "type": "paragraph",
             "paragraph": {
-                "rich_text": [{"type": "text", "text": {"content": text}}]
+                "rich_text": [{"type": "text", "text": {"content": chunk}}]
             }
         }
+        for chunk in split_text(text, chunk_limit)
+    ]
 
-    def add_heading(text, level):
-        return {
-            "object": "block",
-            f"heading_{level}": {
-                "rich_text": [{"type": "text", "text": {"content": text}}]
-            },
-            "type": f"heading_{level}"
-        }
 
-    def add_bulleted_item(text):
-        return {
-            "object": "block",
-            "type": "bulleted_list_item",
-            "bulleted_list_item": {
-                "rich_text": [{"type": "text", "text": {"content": text}}]
-            }
+def _heading_block(text, level, chunk_limit):
+    return {
+        "object": "block",
+        f"heading_{level}": {
+            "rich_text": _rich_text(text, chunk_limit)
+        },
+        "type": f"heading_{level}"
+    }
+
+
+def _bulleted_item_block(text, chunk_limit):
+    return {
+        "object": "block",
+        "type": "bulleted_list_item",
+        "bulleted_list_item": {
+            "rich_text": _rich_text(text, chunk_limit)
         }
+    }
 
-    paragraph_buffer = []
 
-    def flush_buffer():
-        if paragraph_buffer:
-            blocks.append(add_paragraph(" ".join(paragraph_buffer)))
-            paragraph_buffer.clear()
+class MarkdownBlockParser:
+    """
+    Incremental Markdown to Notion blocks converter.
+    Text is fed in arbitrary pieces (e.g. LLM tokens); a block is emitted as soon as it is closed:
+    headings, bullets and reference lines at the end of their line, paragraphs at the next blank
+    line or non-paragraph line. Only the current line and the open paragraph are kept in memory.
+    Args:
+        chunk_limit (int): The maximum number of characters per block.
+    """
 
-    for line in lines:
+    def __init__(self, chunk_limit=1800):
+        self.chunk_limit = chunk_limit
+        self._line = ""
+        self._paragraph = []
+
+    def _flush_paragraph(self, blocks):
+        if self._paragraph:
+            blocks.extend(_paragraph_blocks(" ".join(self._paragraph), self.chunk_limit))
+            self._paragraph = []
+
+    def _parse_line(self, line, blocks):
         stripped = line.strip()
         if stripped.startswith("## "):
-            flush_buffer()
-            blocks.append(add_heading(stripped[3:], level=2))
+            self._flush_paragraph(blocks)
+            blocks.append(_heading_block(stripped[3:], 2, self.chunk_limit))
         elif stripped.startswith("# "):
-            flush_buffer()
-            blocks.append(add_heading(stripped[2:], level=1))
+            self._flush_paragraph(blocks)
+            blocks.append(_heading_block(stripped[2:], 1, self.chunk_limit))
         elif stripped.startswith("- "):
-            flush_buffer()
-            blocks.append(add_bulleted_item(stripped[2:]))
+            self._flush_paragraph(blocks)
+            blocks.append(_bulleted_item_block(stripped[2:], self.chunk_limit))
         elif re.match(r"\[\d+\]", stripped):
-            flush_buffer()
-            blocks.append(add_paragraph(stripped))
+            self._flush_paragraph(blocks)
+            blocks.extend(_paragraph_blocks(stripped, self.chunk_limit))
         elif stripped == "":
-            flush_buffer()
+            self._flush_paragraph(blocks)
         else:
-            paragraph_buffer.append(stripped)
+            self._paragraph.append(stripped)
+
+    def feed(self, text):
+        """
+        Parses a piece of Markdown text.
+        Args:
+            text (str): Next piece of the document.
+        Returns:
+            list: The blocks closed by this piece, in order.
+        """
+        lines = (self._line + text).split("\n")
+        self._line = lines.pop()
+        blocks = []
+        for line in lines:
+            self._parse_line(line, blocks)
+        return blocks
 
-    flush_buffer()
-    return blocks
+    def close(self):
+        """
+        Ends the document.
+        Returns:
+            list: The blocks still open (last line and paragraph).
+        """
+        blocks = []
+        self._parse_line(self._line, blocks)
+        self._line = ""
+        self._flush_paragraph(blocks)
+        return blocks
 
 
-def upload_to_notion(markdown_text, title_prefix="AI Governance Report"):
+def markdown_to_blocks(markdown_text, chunk_limit=1800):
     """
-    Uploads a Markdown text to Notion as a new page in the specified database.
+    Convert Markdown text to Notion blocks.
+    This function processes Markdown text and converts it into a list of Notion blocks.
+    It handles headings, paragraphs, bulleted lists, and numbered references.
     Args:
-        markdown_text (str): The Markdown text to upload.
-        title_prefix (str): The prefix for the page title.
+        markdown_text (str): The Markdown text to convert.
+        chunk_limit (int): The maximum number of characters per block.
     Returns:
-        dict: The response from the Notion API containing the page URL.
+        list: A list of Notion blocks.
     """
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    title = f"{title_prefix} - {date_str}"
-    blocks = markdown_to_blocks(markdown_text)
+    parser = MarkdownBlockParser(chunk_limit)
+    return parser.feed(markdown_text) + parser.close()
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by all requests of a client.
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum burst size.
+    """
+
+    def __init__(self, rate=NOTION_REQUESTS_PER_SECOND, capacity=NOTION_REQUESTS_PER_SECOND):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available and consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = TokenBucket()
+
+
+def call_with_retry(fn, rate_limiter=None, max_retries=5, base_delay=None, verify=None, **kwargs):
+    """
+    Calls a Notion API method under the rate limit, retrying throttled and transient failures
+    with exponential backoff. A Retry-After header from Notion takes precedence over the backoff.
+    Writes pass `verify`: after a timeout or a server error other than 429/503, the request may
+    have been applied, so `verify()` is asked for its result before the request is sent again.
+    Args:
+        fn (callable): Notion client method, e.g. notion.blocks.children.append.
+        rate_limiter (TokenBucket): Limiter to respect. Defaults to the process-wide one.
+        max_retries (int): Maximum number of retries.
+        base_delay (float): First backoff delay in seconds. Defaults to RETRY_BASE_DELAY.
+        verify (callable): For writes, returns the result of the request if Notion applied it, else None.
+        **kwargs: Arguments of the API call.
+    Returns:
+        dict: The API response.
+    """
+    rate_limiter = rate_limiter or _rate_limiter
+    base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire()
+        try:
+            return fn(**kwargs)
+        except (HTTPResponseError, RequestTimeoutError) as e:
+            status = getattr(e, "status", None)
+            if attempt == max_retries or (status is not None and status not in RETRYABLE_STATUS):
+                raise
+            retry_after = (getattr(e, "headers", None) or {}).get("retry-after")
+            delay = float(retry_after) if retry_after else base_delay * 2 ** attempt * (1 + random.random() / 2)
+            print(f"Notion request failed ({status or 'timeout'}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+        if verify is not None and status not in REJECTED_STATUS:
+            applied = verify()
+            if applied is not None:
+                print("Notion applied the failed request, not sending it again")
+                return applied
+
 
-    response = notion.pages.create(
+def list_children(notion, block_id, rate_limiter=None):
+    """
+    Returns every child block of a page or block, following pagination.
+    """
+    children = []
+    cursor = None
+    while True:
+        kwargs = {"start_cursor": cursor} if cursor else {}
+        response = call_with_retry(
+            notion.blocks.children.list, rate_limiter=rate_limiter, block_id=block_id, page_size=100, **kwargs
+        )
+        children.extend(response["results"])
+        if not response.get("has_more"):
+            return children
+        cursor = response["next_cursor"]
+
+
+def _page_title(page):
+    title = page.get("properties", {}).get("Doc name", {}).get("title", [])
+    return "".join(part.get("plain_text") or part.get("text", {}).get("content", "") for part in title)
+
+
+def find_page(notion, title, since, rate_limiter=None, attempts=PAGE_LOOKUP_ATTEMPTS, delay=None):
+    """
+    Looks for a page with the given title created since a time, e.g. by a request that timed out.
+    Args:
+        notion: Notion client.
+        title (str): Page title.
+        since (datetime): Time (UTC) the page creation was first requested.
+        rate_limiter (TokenBucket): Rate limiter for the requests.
+        attempts (int): Number of searches, as new pages are indexed with a delay.
+        delay (float): Seconds between searches. Defaults to RETRY_BASE_DELAY.
+    Returns:
+        dict: The page, or None if it was not created.
+    """
+    # Notion reports creation times rounded down to the minute.
+    since = since.replace(second=0, microsecond=0) - timedelta(minutes=1)
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(RETRY_BASE_DELAY if delay is None else delay)
+        response = call_with_retry(
+            notion.search, rate_limiter=rate_limiter, query=title, filter={"property": "object", "value": "page"}
+        )
+        for page in response["results"]:
+            created = datetime.fromisoformat(page["created_time"].replace("Z", "+00:00"))
+            if _page_title(page) == title and created >= since and not page.get("archived"):
+                return page
+    return None
+
+
+class BlockAppender:
+    """
+    Appends blocks to a Notion page in order, from a background sender thread.
+    Callers hand over batches of blocks without waiting for the network; a single sender keeps
+    the requests in submission order, which Notion needs to preserve block order on the page.
+    Args:
+        notion: Notion client.
+        page_id (str): Page (or block) receiving the children.
+        rate_limiter (TokenBucket): Rate limiter for the requests.
+        max_pending (int): Maximum number of batches queued before submit blocks.
+        existing_blocks (int): Number of blocks already on the page.
+    """
+
+    def __init__(self, notion, page_id, rate_limiter=None, max_pending=8, existing_blocks=0):
+        self.notion = notion
+        self.page_id = page_id
+        self.rate_limiter = rate_limiter
+        self.requests = 0
+        # Blocks on the page so far, used to tell whether a failed append was applied.
+        self.blocks_on_page = existing_blocks
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+        self._thread.start()
+
+    def _send_loop(self):
+        while True:
+            blocks = self._queue.get()
+            if blocks is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                call_with_retry(
+                    self.notion.blocks.children.append,
+                    rate_limiter=self.rate_limiter,
+                    verify=lambda: self._appended(blocks),
+                    block_id=self.page_id,
+                    children=blocks,
+                )
+                self.requests += 1
+                self.blocks_on_page += len(blocks)
+            except Exception as e:
+                self._error = e
+
+    def _appended(self, blocks):
+        # Only this sender appends to the page, so the batch was applied if the page grew by it.
+        children = list_children(self.notion, self.page_id, self.rate_limiter)
+        if len(children) >= self.blocks_on_page + len(blocks):
+            return {"object": "list", "results": children[self.blocks_on_page:]}
+        return None
+
+    def submit(self, blocks):
+        """
+        Queues blocks for appending, split into requests of at most MAX_BLOCKS_PER_REQUEST.
+        """
+        if self._error is not None:
+            raise self._error
+        for start in range(0, len(blocks), MAX_BLOCKS_PER_REQUEST):
+            self._queue.put(blocks[start:start + MAX_BLOCKS_PER_REQUEST])
+
+    def close(self):
+        """
+        Waits for every queued batch to be sent and re-raises the first failure, if any.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def create_page(notion, title, blocks, rate_limiter=None):
+    """
+    Creates a database page with a first chunk of blocks.
+    Args:
+        notion: Notion client.
+        title (str): Page title.
+        blocks (list): Initial blocks, at most MAX_BLOCKS_PER_REQUEST are sent.
+        rate_limiter (TokenBucket): Rate limiter for the request.
+    Returns:
+        dict: The created page.
+    """
+    since = datetime.now(timezone.utc)
+    return call_with_retry(
+        notion.pages.create,
+        rate_limiter=rate_limiter,
+        verify=lambda: find_page(notion, title, since, rate_limiter),
         parent={"database_id": NOTION_DATABASE_ID},
         properties={
             "Doc name": {
                 "title": [{"text": {"content": title}}]
             }
         },
-        children=blocks
+        children=blocks[:MAX_BLOCKS_PER_REQUEST],
     )
+
+
+def mark_failed(notion, page_id, blocks_on_page, error, rate_limiter=None):
+    """
+    Marks a streamed page whose generation or upload failed: a callout is appended after the
+    published blocks, or the page is archived when the callout cannot be added.
+    Args:
+        notion: Notion client.
+        page_id (str): The incomplete page.
+        blocks_on_page (int): Number of blocks already appended to the page.
+        error (Exception): The failure.
+        rate_limiter (TokenBucket): Rate limiter for the requests.
+    """
+    callout = {
+        "object": "block",
+        "type": "callout",
+        "callout": {
+            "rich_text": [{"type": "text", "text": {"content": f"{FAILURE_NOTICE} ({type(error).__name__})"}}],
+            "icon": {"type": "emoji", "emoji": "⚠️"},
+        }
+    }
+    appender = BlockAppender(notion, page_id, rate_limiter, existing_blocks=blocks_on_page)
+    try:
+        appender.submit([callout])
+        appender.close()
+        return
+    except Exception as e:
+        print(f"Could not add the failure notice to the Notion page: {e}")
+    try:
+        call_with_retry(notion.pages.update, rate_limiter=rate_limiter, page_id=page_id, archived=True)
+        print("Archived the incomplete Notion page")
+    except Exception as e:
+        print(f"Could not archive the incomplete Notion page: {e}")
+
+
+def upload_to_notion(markdown_text, title_prefix="AI Governance Report", notion=None, date=None):
+    """
+    Uploads a Markdown text to Notion as a new page in the specified database.
+    Args:
+        markdown_text (str): The Markdown text to upload.
+        title_prefix (str): The prefix for the page title.
+        notion: Optional Notion client. Defaults to the process-wide client.
+        date (str): Report date used in the page title. Defaults to today.
+    Returns:
+        dict: The response from the Notion API containing the page URL.
+    """
+    date_str = date or datetime.now().strftime("%Y-%m-%d")
+    title = f"{title_prefix} - {date_str}"
+    blocks = markdown_to_blocks(markdown_text)
+    notion = notion or get_notion_client()
+
+    response = create_page(notion, title, blocks)
+    remaining = blocks[MAX_BLOCKS_PER_REQUEST:]
+    if remaining:
+        appender = BlockAppender(notion, response["id"], existing_blocks=MAX_BLOCKS_PER_REQUEST)
+        appender.submit(remaining)
+        appender.close()
+    print(f"Notion URL: {response['url']}")
+    return response
+
+
+def stream_to_notion(chunks, title_prefix="AI Governance Report", notion=None,
+                     batch_blocks=STREAM_BATCH_BLOCKS, flush_seconds=STREAM_FLUSH_SECONDS, date=None):
+    """
+    Publishes a Markdown document to a new Notion page while it is being produced.
+    The page is created up front; finished blocks are appended in batches of `batch_blocks`,
+    or as soon as `flush_seconds` have passed since the last batch. When the chunks or the
+    upload fail, the page is marked as incomplete (see mark_failed) and the error is re-raised.
+    Args:
+        chunks (iterable): Pieces of Markdown text, e.g. the LLM token stream.
+        title_prefix (str): The prefix for the page title.
+        notion: Optional Notion client. Defaults to the process-wide client.
+        batch_blocks (int): Number of blocks per append request.
+        flush_seconds (float): Maximum time a finished block waits for its batch.
+        date (str): Report date used in the page title. Defaults to today.
+    Returns:
+        dict: The response from the Notion API containing the page URL.
+    """
+    date_str = date or datetime.now().strftime("%Y-%m-%d")
+    title = f"{title_prefix} - {date_str}"
+    notion = notion or get_notion_client()
+
+    start = time.perf_counter()
+    response = create_page(notion, title, [])
     print(f"Notion URL: {response['url']}")
-    return response
\ No newline at end of file
+
+    parser = MarkdownBlockParser()
+    appender = BlockAppender(notion, response["id"])
+    pending = []
+    last_flush = time.monotonic()
+    first_block = None
+    try:
+        for chunk in chunks:
+            pending.extend(parser.feed(chunk))
+            if pending and (len(pending) >= batch_blocks or time.monotonic() - last_flush >= flush_seconds):
+                appender.submit(pending)
+                pending = []
+                last_flush = time.monotonic()
+                if first_block is None:
+                    first_block = time.perf_counter() - start
+        pending.extend(parser.close())
+        if pending:
+            appender.submit(pending)
+        appender.close()
+    except Exception as e:
+        try:
+            appender.close()
+        except Exception:
+            pass
+        mark_failed(notion, response["id"], appender.blocks_on_page, e)
+        raise
+    if first_block is not None:
+        print(f"First blocks published after {first_block:.1f}s")
+    return response
+
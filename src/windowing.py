@@ -0,0 +1,198 @@
+"""
+This module splits long documents into overlapping, token-aware windows sized for each NLP model
+and merges the per-window model outputs back into one result per document.
+Windows are produced lazily and handed out in bounded buffers, and every window is tokenized on
+its own slice of text, so the memory used by inference does not grow with the document length.
+"""
+import re
+from collections import namedtuple
+
+# Window size and overlap, in tokens, per model. They leave room for the special tokens of the
+# 512-token encoders and, for QA, for the question inside the 384-token QA input.
+WINDOW_SPECS = {
+    "ner": {"max_tokens": 448, "stride": 64},
+    "sentiment": {"max_tokens": 480, "stride": 32},
+    "qa": {"max_tokens": 320, "stride": 64},
+}
+# Upper bound on characters per token, used to slice the text tokenized for one window.
+MAX_CHARS_PER_TOKEN = 12
+# Windows sent to the models per inference round.
+WINDOW_BUFFER_SIZE = 64
+
+Window = namedtuple("Window", ["doc", "start", "end", "n_tokens"])
+
+
+def token_offsets(tokenizer, text):
+    """
+    Returns the (start, end) character offsets of the tokens of a text.
+    Without a fast tokenizer, whitespace-separated words stand in for tokens.
+    """
+    if tokenizer is not None:
+        try:
+            encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+            return [tuple(offset) for offset in encoding["offset_mapping"]]
+        except (NotImplementedError, TypeError, KeyError):
+            pass
+    return [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+
+
+def iter_windows(text, tokenizer, max_tokens, stride):
+    """
+    Yields overlapping windows over a text, each covering at most `max_tokens` tokens and sharing
+    `stride` tokens with the previous one. Only a bounded slice of the text is tokenized at a time.
+    Args:
+        text (str): Document text.
+        tokenizer: Tokenizer of the model, or None.
+        max_tokens (int): Maximum number of tokens per window.
+        stride (int): Number of tokens shared by consecutive windows.
+    Yields:
+        tuple: (start, end, n_tokens) of each window, with character offsets into `text`.
+    """
+    start = 0
+    while start < len(text):
+        piece_end = min(len(text), start + max_tokens * MAX_CHARS_PER_TOKEN)
+        if tokenizer is None and piece_end == len(text):
+            # Counting words is much cheaper than collecting their offsets.
+            n_words = len(text[start:].split())
+            if n_words <= max_tokens:
+                if n_words:
+                    yield start, len(text), n_words
+                return
+        offsets = token_offsets(tokenizer, text[start:piece_end])
+        if piece_end < len(text) and len(offsets) > 1:
+            # The last token may be a word cut by the slice.
+            offsets.pop()
+        if not offsets:
+            # Only whitespace in this slice.
+            start = piece_end
+            continue
+        if piece_end == len(text) and len(offsets) <= max_tokens:
+            yield start, len(text), len(offsets)
+            return
+
+        window = offsets[:max_tokens]
+        yield start, start + window[-1][1], len(window)
+        next_token = max(1, len(window) - stride)
+        start += max(1, window[next_token][0] if next_token < len(window) else window[-1][1])
+
+
+def iter_window_batches(texts, tokenizer, spec, buffer_size=WINDOW_BUFFER_SIZE):
+    """
+    Yields the windows of several documents in buffers of at most `buffer_size` windows.
+    Args:
+        texts (list): Document texts.
+        tokenizer: Tokenizer of the model, or None.
+        spec (dict): Window spec with 'max_tokens' and 'stride' (see WINDOW_SPECS).
+        buffer_size (int): Maximum number of windows per buffer.
+    Yields:
+        list: Window tuples, in document order.
+    """
+    buffer = []
+    for doc, text in enumerate(texts):
+        for start, end, n_tokens in iter_windows(text, tokenizer, spec["max_tokens"], spec["stride"]):
+            buffer.append(Window(doc, start, end, n_tokens))
+            if len(buffer) >= buffer_size:
+                yield buffer
+                buffer = []
+    if buffer:
+        yield buffer
+
+
+class EntityMerger:
+    """
+    Merges NER outputs of overlapping windows. Offsets are shifted to the document and entities
+    found twice in an overlap, or cut at a window edge, are reduced to the longest span
+    (then the highest score).
+    Args:
+        n_docs (int): Number of documents.
+    """
+
+    def __init__(self, n_docs):
+        self._entities = [[] for _ in range(n_docs)]
+
+    def add(self, window, entities):
+        for entity in entities:
+            if entity.get("start") is not None:
+                entity = dict(entity, start=entity["start"] + window.start, end=entity["end"] + window.start)
+            self._entities[window.doc].append(entity)
+
+    def _merge(self, entities):
+        if not any(e.get("start") is not None for e in entities):
+            return entities
+        merged = []
+        for entity in sorted(entities, key=lambda e: (e["start"], -(e["end"] - e["start"]), -e["score"])):
+            if merged and entity["start"] < merged[-1]["end"]:
+                kept = merged[-1]
+                if (entity["end"] - entity["start"], entity["score"]) > (kept["end"] - kept["start"], kept["score"]):
+                    merged[-1] = entity
+                continue
+            merged.append(entity)
+        return merged
+
+    def results(self):
+        """
+        Returns the merged entities of each document, in text order.
+        """
+        return [self._merge(entities) for entities in self._entities]
+
+
+class AnswerMerger:
+    """
+    Keeps the best-scoring QA answer per document and question across windows.
+    Args:
+        n_docs (int): Number of documents.
+        n_questions (int): Number of questions asked on every document.
+    """
+
+    def __init__(self, n_docs, n_questions):
+        self._answers = [[None] * n_questions for _ in range(n_docs)]
+
+    def add(self, window, question_index, answer):
+        best = self._answers[window.doc][question_index]
+        if best is None or answer["score"] > best["score"]:
+            if answer.get("start") is not None:
+                answer = dict(answer, start=answer["start"] + window.start, end=answer["end"] + window.start)
+            self._answers[window.doc][question_index] = answer
+
+    def results(self):
+        """
+        Returns the best answers of each document, one per question.
+        """
+        empty = {"answer": "", "score": 0.0, "start": 0, "end": 0}
+        return [[answer or empty for answer in answers] for answers in self._answers]
+
+
+class SentimentMerger:
+    """
+    Averages the sentiment of a document's windows, weighted by their length in tokens.
+    The sentiment model is binary: a window labelled NEGATIVE with score s counts as a
+    positive probability of 1 - s.
+    Args:
+        n_docs (int): Number of documents.
+        positive_label (str): Label of the positive class.
+    """
+
+    def __init__(self, n_docs, positive_label="POSITIVE", negative_label="NEGATIVE"):
+        self.positive_label = positive_label
+        self.negative_label = negative_label
+        self._weighted = [0.0] * n_docs
+        self._weights = [0] * n_docs
+
+    def add(self, window, output):
+        positive = output["score"] if output["label"] == self.positive_label else 1 - output["score"]
+        weight = max(window.n_tokens, 1)
+        self._weighted[window.doc] += positive * weight
+        self._weights[window.doc] += weight
+
+    def results(self):
+        """
+        Returns one {'label', 'score'} result per document.
+        """
+        results = []
+        for weighted, weight in zip(self._weighted, self._weights):
+            positive = weighted / weight if weight else 0.5
+            if positive >= 0.5:
+                results.append({"label": self.positive_label, "score": positive})
+            else:
+                results.append({"label": self.negative_label, "score": 1 - positive})
+        return results
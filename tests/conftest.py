@@ -0,0 +1,18 @@
+"""
+Shared fixtures of the test suite.
+"""
+import pytest
+
+from benchmarks.fakes import fake_pipeline
+from src.model_registry import registry
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """
+    Points the model registry at the deterministic fake pipelines for the test.
+    """
+    monkeypatch.setattr(registry, "backend", "pytorch")
+    monkeypatch.setattr(registry, "_loader", fake_pipeline)
+    monkeypatch.setattr(registry, "_models", {})
+    monkeypatch.setattr(registry, "timings", {})
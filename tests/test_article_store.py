@@ -0,0 +1,125 @@
+"""
+Tests of the article store and of delta mode.
+"""
+import re
+
+import pytest
+
+import lambda_function
+from benchmarks.fakes import FakeMessage, synthetic_article
+from src.article_store import ArticleStore, DeltaAnnotator, article_hash, delta_sections
+from src.executor import PipelinedExecutor
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore(str(tmp_path / "articles.sqlite"))
+    yield store
+    store.close()
+
+
+def annotate(results):
+    return [{"title": r["title"], "summary": r["content"][:50], "url": r["url"]} for r in results]
+
+
+class CountingAnnotator:
+    def __init__(self):
+        self.annotated = []
+
+    def __call__(self, results):
+        self.annotated.extend(r["url"] for r in results)
+        return annotate(results)
+
+
+def stored(store, results, topic="general", section="Policy", seen="2026-10-12"):
+    for entry in DeltaAnnotator(store, annotate)(results):
+        store.upsert(entry, topic, section, seen=seen)
+
+
+def test_unchanged_articles_are_reused_and_changed_ones_annotated_again(store):
+    known, changed, new = (synthetic_article("delta", i) for i in range(3))
+    stored(store, [known, changed])
+    changed = dict(changed, content=changed["content"] + " Updated.")
+    annotator = CountingAnnotator()
+    delta = DeltaAnnotator(store, annotator)
+
+    entries = delta([known, changed, new])
+
+    assert annotator.annotated == [changed["url"], new["url"]]
+    assert [entry["is_new"] for entry in entries] == [False, True, True]
+    assert entries[1]["content_hash"] == article_hash(changed)
+    assert (delta.reused, delta.annotated) == (1, 2)
+
+
+def test_seen_dates_only_move_outwards(store):
+    article = synthetic_article("delta", 0)
+    for seen in ("2026-10-12", "2026-10-05", "2026-10-19", "2026-10-08"):
+        stored(store, [article], seen=seen)
+
+    entry = store.lookup(article)
+    assert (entry["first_seen"], entry["last_seen"]) == ("2026-10-05", "2026-10-19")
+
+
+def test_section_is_kept_per_topic(store):
+    article = synthetic_article("delta", 0)
+    stored(store, [article], topic="general", section="Policy", seen="2026-10-12")
+    stored(store, [article], topic="research", section="Benchmarks", seen="2026-10-19")
+    # A backfill does not move the article to the section it had in the past.
+    stored(store, [article], topic="general", section="Investment", seen="2026-10-05")
+
+    assert [e["url"] for e in store.recent("general", "Policy")] == [article["url"]]
+    assert [e["url"] for e in store.recent("research", "Benchmarks")] == [article["url"]]
+    assert store.recent("general", "Investment") == []
+    assert store.count() == 1
+
+
+def test_delta_sections_keep_new_entries_and_fill_context_from_the_store(store):
+    old = synthetic_article("delta", 0)
+    stored(store, [old], section="Policy")
+    new = dict(annotate([synthetic_article("delta", 1)])[0], is_new=True)
+
+    sections, n_new = delta_sections(
+        [{"section_title": "Policy", "entries": [new]}, {"section_title": "Investment", "entries": []}],
+        store, "general", context_per_section=2,
+    )
+
+    assert n_new == 1
+    assert sections == [{"section_title": "Policy", "entries": [
+        new, dict(store.lookup(old), previously_reported=True),
+    ]}]
+
+
+class TitleQuestionsLLM:
+    """
+    Asks one question per article of a question-generation prompt, naming its title.
+    """
+
+    def invoke(self, prompt):
+        titles = re.findall(r"Título: (.*)", str(prompt))
+        return FakeMessage("\n".join(f"- What about {title}?" for title in titles), str(prompt))
+
+
+def test_delta_questions_follow_their_articles(store):
+    articles = [dict(synthetic_article("delta", i), title=f"Article {i}") for i in range(5)]
+    stored(store, [articles[0], articles[2]])
+    # Known articles in between new ones, and an article shared by both sections.
+    queries = {("general", "Policy"): "policy", ("general", "Investment"): "investment"}
+    results = {"policy": articles[:4], "investment": [articles[3], articles[0], articles[4]]}
+    llm = TitleQuestionsLLM()
+
+    executor = PipelinedExecutor(
+        lambda query: results[query],
+        lambda section_results: lambda_function.section_questions(llm, section_results, store),
+        DeltaAnnotator(store, annotate),
+        batch_size=2,
+    )
+    sections = lambda_function.topic_sections(executor.run(queries))
+
+    questions = {entry["title"]: entry.get("qa_questions") for s in sections for entry in s["entries"]}
+    assert questions == {
+        "Article 0": None,
+        "Article 1": "What about Article 1?",
+        "Article 2": None,
+        "Article 3": "What about Article 3?",
+        "Article 4": "What about Article 4?",
+    }
@@ -0,0 +1,54 @@
+"""
+Tests of the size bound of the disk cache.
+"""
+import os
+
+from src.cache import DiskCache, make_key
+
+MAX_BYTES = 5000
+
+
+def count_walks(cache):
+    walks = []
+    entries = cache._entries
+
+    def counting_entries():
+        walks.append(1)
+        return entries()
+
+    cache._entries = counting_entries
+    return walks
+
+
+def cache_bytes(path):
+    return sum(f.stat().st_size for f in path.rglob("*.json"))
+
+
+def test_full_cache_is_walked_only_occasionally(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=MAX_BYTES)
+    walks = count_walks(cache)
+
+    for i in range(200):
+        cache.set("annotations", make_key(i), {"entities": [f"Entity {i}"], "sentiment": "NEUTRAL"})
+        assert cache_bytes(tmp_path) <= MAX_BYTES
+
+    # Each eviction frees 10% of the bound, i.e. several entries of about 100 bytes.
+    assert 1 < len(walks) < 40
+    assert cache_bytes(tmp_path) == cache._size
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=MAX_BYTES)
+    cache.set("annotations", "kept", {"text": "x" * 100})
+    for i in range(30):
+        cache.set("annotations", make_key(i), {"text": "y" * 100})
+    # Make every entry older than the next read of "kept".
+    for file_path in tmp_path.rglob("*.json"):
+        os.utime(file_path, (0, 0))
+    assert cache.get("annotations", "kept") is not None
+
+    for i in range(30, 40):
+        cache.set("annotations", make_key(i), {"text": "y" * 100})
+
+    assert cache.get("annotations", "kept") is not None
+    assert cache_bytes(tmp_path) <= MAX_BYTES
@@ -0,0 +1,18 @@
+"""
+Tests of URL normalization for cross-section deduplication.
+"""
+from src.dedup import normalize_url
+
+
+def test_tracking_parameters_are_dropped():
+    assert normalize_url("https://www.example.org/news/ai-act/?utm_source=x&utm_Medium=y&fbclid=1&id=7#top") == \
+        normalize_url("http://example.org/news/ai-act?gclid=2&mc_cid=3&mc_eid=4&id=7")
+
+
+def test_content_parameters_are_kept():
+    assert normalize_url("https://data.gov/report?source=census") != normalize_url("https://data.gov/report?source=bls")
+    assert normalize_url("https://example.org/page?ref=annex-2") != normalize_url("https://example.org/page")
+
+
+def test_arxiv_links_map_to_the_abstract():
+    assert normalize_url("https://arxiv.org/pdf/2401.01234v2.pdf") == normalize_url("https://arxiv.org/abs/2401.01234")
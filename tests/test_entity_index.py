@@ -0,0 +1,74 @@
+"""
+Tests of the vectorized entity centralities against networkx.
+"""
+import random
+
+import networkx as nx
+import pytest
+
+from src.entity_index import EntityIndex, article_centralities, entity_runs
+from src.nlp_pipeline import build_entity_graph
+
+NAMES = ["OpenAI", "NIST", "UNESCO", "Meta", "China", "France", "Nvidia", "Mistral"]
+
+
+def random_article(rng):
+    # Small vocabularies give repeated mentions, self-loops and isolated entities.
+    names = NAMES[:rng.randint(1, len(NAMES))]
+    return [
+        {"word": rng.choice(names), "score": rng.choice([0.5, 0.9, 0.95, 0.99])}
+        for _ in range(rng.randint(0, 12))
+    ]
+
+
+def test_article_centralities_match_networkx_degree_centrality():
+    rng = random.Random(16)
+    articles = [random_article(rng) for _ in range(2000)]
+
+    # Batches of articles, as annotated by the pipeline.
+    centralities = []
+    for i in range(0, len(articles), 25):
+        centralities += article_centralities([entity_runs(raw) for raw in articles[i:i + 25]])
+
+    for raw, ranked in zip(articles, centralities):
+        expected = nx.degree_centrality(build_entity_graph(raw))
+        assert dict(ranked) == pytest.approx(expected)
+        values = [value for _, value in ranked]
+        assert values == sorted(values, reverse=True)
+
+
+def test_pagerank_matches_networkx():
+    rng = random.Random(3)
+    index = EntityIndex()
+    runs_list = [entity_runs(random_article(rng)) for _ in range(200)]
+    index.add(runs_list[:120])
+    index.add(runs_list[120:])
+
+    graph = nx.Graph()
+    graph.add_nodes_from(index.names)
+    for runs in runs_list:
+        pairs = {tuple(sorted(pair)) for run in runs for pair in zip(run, run[1:]) if pair[0] != pair[1]}
+        for a, b in pairs:
+            weight = graph.edges[a, b]["weight"] + 1 if graph.has_edge(a, b) else 1
+            graph.add_edge(a, b, weight=weight)
+    expected = nx.pagerank(graph, weight="weight", tol=1e-10)
+
+    assert dict(zip(index.names, index.pagerank(tol=1e-12))) == pytest.approx(expected, abs=1e-6)
+
+
+def test_key_actors_rank_by_pagerank_and_break_ties_by_name():
+    # A star: the hub ranks first, the leaves tie and follow in name order, whatever the
+    # order in which the batches were added.
+    batches = [[[["Meta", "OpenAI"]], [["OpenAI", "China"]]], [[["Anthropic", "OpenAI"]]]]
+    rankings = []
+    for order in (batches, batches[::-1]):
+        index = EntityIndex()
+        for runs_list in order:
+            index.add(runs_list)
+        rankings.append([actor["entity"] for actor in index.key_actors()])
+
+    assert rankings[0] == rankings[1] == ["OpenAI", "Anthropic", "China", "Meta"]
+    hub, leaf = index.key_actors(top_n=2)
+    assert hub["pagerank"] > leaf["pagerank"]
+    assert (hub["degree"], hub["articles"]) == (1.0, 3)
+    assert (leaf["degree"], leaf["articles"]) == (pytest.approx(1 / 3), 1)
@@ -0,0 +1,76 @@
+"""
+Tests of the pipelined executor against fake Tavily and LLM clients with network latency.
+"""
+import time
+
+from benchmarks.fakes import FakeLLM, FakeTavily
+from src.executor import PipelinedExecutor
+from src.nlp_pipeline import generate_qa_questions
+
+LATENCY = 0.05
+N_SECTIONS = 8
+
+
+def run_executor(mode):
+    """
+    Runs the executor over N_SECTIONS queries and returns its sections and wall time.
+    """
+    tavily = FakeTavily(latency=LATENCY)
+    llm = FakeLLM(latency=LATENCY)
+    queries = {("general", f"Section {i}"): f"query {i}" for i in range(N_SECTIONS)}
+
+    def search(query):
+        return tavily.search(query=query, max_results=3)["results"]
+
+    def questions(results):
+        entries_preview = [{"title": r["title"], "summary": r["content"][:300]} for r in results]
+        return generate_qa_questions(llm, entries_preview, n_questions=4)
+
+    def annotate(results):
+        return [{"title": r["title"], "url": r["url"]} for r in results]
+
+    executor = PipelinedExecutor(search, questions, annotate, max_concurrency=4, batch_size=4, mode=mode)
+    start = time.perf_counter()
+    sections = executor.run(queries)
+    return sections, time.perf_counter() - start
+
+
+def summarize(sections):
+    return [(s.section_title, s.entries, s.questions) for s in sections]
+
+
+def test_threads_mode_is_faster_than_sequential():
+    sequential, sequential_time = run_executor("sequential")
+    threaded, threaded_time = run_executor("threads")
+
+    # Sequentially every section waits for its search and its LLM call in turn.
+    assert sequential_time >= N_SECTIONS * 2 * LATENCY
+    assert threaded_time < sequential_time * 0.6
+
+
+def test_threads_mode_returns_the_same_sections_in_order():
+    sequential, _ = run_executor("sequential")
+    threaded, _ = run_executor("threads")
+
+    assert [s.section_title for s in threaded] == [("general", f"Section {i}") for i in range(N_SECTIONS)]
+    assert summarize(threaded) == summarize(sequential)
+    assert all(len(s.entries) == 3 for s in threaded)
+
+
+def test_questions_follow_their_result_when_duplicates_are_dropped():
+    results = [
+        {"url": "https://example.org/a", "title": "A", "content": "first"},
+        {"url": "https://www.example.org/a/", "title": "A again", "content": "second"},
+        {"url": "", "title": "No link", "content": "third"},
+        {"url": "", "title": "No link either", "content": "fourth"},
+    ]
+    executor = PipelinedExecutor(
+        lambda query: results,
+        lambda results: [f"Question about {r['title']}" for r in results],
+        lambda results: [{"title": r["title"]} for r in results],
+    )
+    section, = executor.run({("general", "Section"): "query"})
+
+    # The second result duplicates the first by URL; results without a URL are kept apart.
+    assert [entry["title"] for entry in section.entries] == ["A", "No link", "No link either"]
+    assert section.entry_questions == ["Question about A", "Question about No link", "Question about No link either"]
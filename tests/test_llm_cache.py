@@ -0,0 +1,83 @@
+"""
+Tests of the LLM response cache and of the sharing of concurrent identical requests.
+"""
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeLLM
+from src.cache import DiskCache
+from src.llm_cache import CachingLLM
+
+
+class FailingLLM(FakeLLM):
+    def stream(self, prompt):
+        chunks = super().stream(prompt)
+        yield next(chunks)
+        raise ConnectionError("stream dropped")
+
+
+def test_completed_stream_is_cached_and_replayed(tmp_path):
+    llm = FakeLLM()
+    caching = CachingLLM(llm, cache=DiskCache(str(tmp_path)))
+
+    streamed = "".join(chunk.content for chunk in caching.stream("Write the report"))
+    replayed = "".join(chunk.content for chunk in caching.stream("Write the report"))
+
+    assert streamed == replayed == llm.invoke("Write the report").content
+    assert caching.report()["cache_hits"] == 1
+
+
+def test_failed_or_abandoned_stream_is_not_cached(tmp_path):
+    cache = DiskCache(str(tmp_path))
+
+    with pytest.raises(ConnectionError):
+        for _ in CachingLLM(FailingLLM(), cache=cache).stream("Write the report"):
+            pass
+    abandoned = CachingLLM(FakeLLM(), cache=cache).stream("Write the report")
+    next(abandoned)
+    abandoned.close()
+
+    caching = CachingLLM(FakeLLM(), cache=cache)
+    "".join(chunk.content for chunk in caching.stream("Write the report"))
+    assert caching.report()["cache_hits"] == 0
+    assert not list((tmp_path / "llm").glob("*.tmp"))
+
+
+class LateMissCache(DiskCache):
+    """
+    Holds the first lookup of the thread named 'late' after its miss, until `resume` is set.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.missed = threading.Event()
+        self.resume = threading.Event()
+
+    def get(self, namespace, key, count=True):
+        value = super().get(namespace, key, count=count)
+        if threading.current_thread().name == "late" and not self.missed.is_set():
+            self.missed.set()
+            self.resume.wait(timeout=5)
+        return value
+
+
+def test_request_missing_the_cache_while_the_owner_stores_it_shares_its_call(tmp_path):
+    llm = FakeLLM()
+    cache = LateMissCache(str(tmp_path))
+    caching = CachingLLM(llm, cache=cache)
+    responses = {}
+    late = threading.Thread(name="late", target=lambda: responses.update(late=caching.invoke("Write the report")))
+
+    # The late request misses the cache, then the owner calls the model, stores the
+    # response and leaves before the late request takes the lock.
+    late.start()
+    assert cache.missed.wait(timeout=5)
+    responses["owner"] = caching.invoke("Write the report")
+    cache.resume.set()
+    late.join()
+
+    assert llm.calls == 1
+    assert responses["late"].content == responses["owner"].content
+    assert caching.report()["cache_hits"] == 1
+    assert cache.report()["llm"] == {"hits": 0, "misses": 2}
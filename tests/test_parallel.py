@@ -0,0 +1,30 @@
+"""
+Tests of the NLP process pool with the fake pipelines.
+"""
+from benchmarks.fakes import synthetic_articles
+from src.nlp_pipeline import _annotate
+from src.parallel import NLPWorkerPool
+from src.tracing import Tracer, set_tracer
+
+BATCH_SIZE = 4
+
+
+def test_pool_sends_one_model_batch_per_chunk(fake_models, monkeypatch):
+    articles = synthetic_articles(18)
+    with NLPWorkerPool(2, intra_op_threads=1) as pool:
+        chunks = []
+        pool_map = pool._pool.map
+
+        def recording_map(fn, args, chunksize=None):
+            chunks.extend(len(chunk) for chunk, _ in args)
+            return pool_map(fn, args, chunksize=chunksize)
+
+        monkeypatch.setattr(pool._pool, "map", recording_map)
+        tracer = set_tracer(Tracer())
+        entries = pool.annotate(articles, BATCH_SIZE)
+
+    assert pool.batch_articles(BATCH_SIZE) == 2 * BATCH_SIZE
+    assert chunks == [4, 4, 4, 4, 2]
+    # Timings recorded in the workers reach the parent's tracer.
+    assert tracer.metrics()["stages"]["nlp.ner"]["items"] == len(articles)
+    assert entries == _annotate(articles, BATCH_SIZE)
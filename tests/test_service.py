@@ -0,0 +1,36 @@
+"""
+Tests of the job payload checks of the resident worker service.
+"""
+import pytest
+
+from service import validate_job
+
+
+@pytest.mark.parametrize("payload", [
+    {"topic": "general"},
+    {"topics": ["general", "research"], "date": "2025-06-02", "stream": True},
+    {"topic": "all", "delta": True, "date": None, "token_budget": 4000, "executor": "sequential"},
+])
+def test_valid_jobs_are_accepted(payload):
+    validate_job(payload)
+
+
+@pytest.mark.parametrize("payload", [
+    # Paths and process-wide options are service settings.
+    {"topic": "general", "metrics_path": "/etc/x", "article_db": "/root/x.sqlite"},
+    {"topic": "general", "cache_dir": "/tmp/elsewhere"},
+    {"topic": "general", "backend": "onnx"},
+    # Wrong types.
+    {"topic": "general", "date": 5},
+    {"topics": "general"},
+    {"topics": ["general", 1]},
+    {"topic": "general", "batch_size": True},
+    # Wrong values.
+    {"topic": "policy"},
+    {"topic": "general", "date": "02/06/2025"},
+    {"topic": "general", "date": "2025-06-02", "delta": True},
+    [],
+])
+def test_invalid_jobs_are_rejected(payload):
+    with pytest.raises(ValueError):
+        validate_job(payload)
@@ -0,0 +1,35 @@
+"""
+Tests of the stage metrics of the tracer.
+"""
+from src.tracing import Tracer, _peak_rss_mb
+
+
+def test_stages_record_their_own_peak_rss_growth():
+    tracer = Tracer()
+    # Enough to pass the process's earlier high-water mark, whatever other tests used.
+    size = int((_peak_rss_mb() + 64) * 1024 * 1024)
+    with tracer.stage("allocate"):
+        block = "x" * size
+    del block
+    with tracer.stage("after"):
+        small = "x" * 1024
+    stages = tracer.metrics()["stages"]
+
+    assert len(small) == 1024
+    assert stages["allocate"]["peak_rss_growth_mb"] > 48
+    # The earlier high-water mark is not repeated by later stages.
+    assert stages["after"]["peak_rss_growth_mb"] < 4
+
+
+def test_merged_stages_add_counts_and_keep_the_largest_growth():
+    tracer = Tracer()
+    with tracer.stage("nlp.ner", items=2) as span:
+        span.add(cache_hits=1)
+    recorded = tracer.metrics()["stages"]["nlp.ner"]
+    worker = dict(recorded, items=3, peak_rss_growth_mb=recorded["peak_rss_growth_mb"] + 10)
+
+    tracer.merge({"nlp.ner": worker})
+
+    stage = tracer.metrics()["stages"]["nlp.ner"]
+    assert (stage["calls"], stage["items"], stage["cache_hits"]) == (2, 5, 2)
+    assert stage["peak_rss_growth_mb"] == worker["peak_rss_growth_mb"]
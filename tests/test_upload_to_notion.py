@@ -0,0 +1,259 @@
+"""
+Tests of the chunked Notion uploader against a local fake Notion server that injects
+rate limits, server errors and timeouts, some of them after applying the request.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from notion_client import Client
+from notion_client.errors import APIResponseError
+
+import src.upload_to_notion as upload
+from src.upload_to_notion import TokenBucket, markdown_to_blocks, stream_to_notion, upload_to_notion
+
+CLIENT_TIMEOUT = 0.3
+
+
+class FakeNotionServer(ThreadingHTTPServer):
+    """
+    HTTP stand-in for the Notion API endpoints used by the uploader.
+    `faults` maps 'pages.create' and 'blocks.append' to the outcomes of their next requests:
+    '429' and '503' reject the request, '500-applied' and 'timeout-applied' apply it and then
+    fail, 'timeout' fails without applying it and '400' rejects it as invalid. Requests without
+    a scripted fault succeed.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeNotionHandler)
+        self.pages = {}
+        self.faults = {"pages.create": [], "blocks.append": []}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def next_fault(self, endpoint):
+        with self.lock:
+            return self.faults[endpoint].pop(0) if self.faults[endpoint] else None
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (timeout faults).
+            pass
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def _fail(self, fault):
+        if fault.startswith("timeout"):
+            time.sleep(CLIENT_TIMEOUT * 2)
+            self._send(200, {})
+        elif fault.startswith("500"):
+            self._send(500, {"object": "error", "code": "internal_server_error", "message": "Boom"})
+        elif fault == "400":
+            self._send(400, {"object": "error", "code": "validation_error", "message": "Invalid"})
+        elif fault == "503":
+            self._send(503, {"object": "error", "code": "service_unavailable", "message": "Unavailable"},
+                       headers={"Retry-After": "0"})
+        else:
+            self._send(429, {"object": "error", "code": "rate_limited", "message": "Slow down"},
+                       headers={"Retry-After": "0"})
+
+    def _handle_write(self, endpoint, apply):
+        body = self._body()
+        fault = self.server.next_fault(endpoint)
+        if fault in ("400", "429", "503", "timeout"):
+            self._fail(fault)
+            return
+        result = apply(body)
+        if fault:
+            self._fail(fault)
+        else:
+            self._send(200, result)
+
+    def _create_page(self, body):
+        page_id = str(uuid.uuid4())
+        page = {
+            "object": "page",
+            "id": page_id,
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+            "created_time": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z"),
+            "archived": False,
+            "properties": {"Doc name": {"type": "title", "title": [
+                dict(part, plain_text=part["text"]["content"]) for part in body["properties"]["Doc name"]["title"]
+            ]}},
+            "children": list(body.get("children", [])),
+        }
+        with self.server.lock:
+            self.server.pages[page_id] = page
+        return {key: value for key, value in page.items() if key != "children"}
+
+    def _append(self, page_id, body):
+        with self.server.lock:
+            self.server.pages[page_id]["children"].extend(body["children"])
+        return {"object": "list", "results": body["children"]}
+
+    def do_POST(self):
+        if self.path == "/v1/pages":
+            self._handle_write("pages.create", self._create_page)
+        elif self.path == "/v1/search":
+            query = self._body().get("query", "")
+            with self.server.lock:
+                results = [
+                    {key: value for key, value in page.items() if key != "children"}
+                    for page in self.server.pages.values()
+                    if query in upload._page_title(page)
+                ]
+            self._send(200, {"object": "list", "results": results, "has_more": False, "next_cursor": None})
+        else:
+            self._send(404, {"object": "error", "code": "object_not_found", "message": self.path})
+
+    def do_PATCH(self):
+        match = re.fullmatch(r"/v1/blocks/([^/]+)/children", self.path)
+        page = re.fullmatch(r"/v1/pages/([^/]+)", self.path)
+        if match and match.group(1) in self.server.pages:
+            self._handle_write("blocks.append", lambda body: self._append(match.group(1), body))
+        elif page and page.group(1) in self.server.pages:
+            self._update_page(page.group(1))
+        else:
+            self._send(404, {"object": "error", "code": "object_not_found", "message": self.path})
+
+    def _update_page(self, page_id):
+        body = self._body()
+        with self.server.lock:
+            page = self.server.pages[page_id]
+            page["archived"] = body.get("archived", page["archived"])
+        self._send(200, {key: value for key, value in page.items() if key != "children"})
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/blocks/([^/?]+)/children\?(.*)", self.path)
+        if not match:
+            self._send(404, {"object": "error", "code": "object_not_found", "message": self.path})
+            return
+        params = dict(part.split("=", 1) for part in match.group(2).split("&") if "=" in part)
+        start, size = int(params.get("start_cursor", 0)), int(params.get("page_size", 100))
+        with self.server.lock:
+            children = self.server.pages[match.group(1)]["children"]
+            results = children[start:start + size]
+            more = start + size < len(children)
+        self._send(200, {"object": "list", "results": results, "has_more": more,
+                         "next_cursor": str(start + size) if more else None})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeNotionServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(upload, "_rate_limiter", TokenBucket(rate=1000, capacity=1000))
+    monkeypatch.setattr(upload, "RETRY_BASE_DELAY", 0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def notion(server):
+    options = {"auth": "test", "base_url": server.url, "timeout_ms": int(CLIENT_TIMEOUT * 1000)}
+    try:
+        # Leave retries to the uploader.
+        return Client(retry=False, **options)
+    except TypeError:
+        # Older clients have no built-in retries.
+        return Client(**options)
+
+
+def long_report(n_sections=90):
+    lines = []
+    for i in range(n_sections):
+        lines += [f"## Section {i}", "", f"Paragraph {i} about governance [{i}].", ""]
+        lines += [f"- Point {i}.{j}" for j in range(3)]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def only_page(server):
+    assert len(server.pages) == 1
+    return next(iter(server.pages.values()))
+
+
+def test_upload_survives_rejected_and_applied_failures(server, notion):
+    markdown = long_report()
+    expected = markdown_to_blocks(markdown)
+    assert len(expected) > 4 * upload.MAX_BLOCKS_PER_REQUEST
+    server.faults["pages.create"] = ["429", "timeout-applied"]
+    server.faults["blocks.append"] = ["503", "timeout-applied", "500-applied", "timeout"]
+
+    response = upload_to_notion(markdown, title_prefix="Report", notion=notion, date="2026-10-12")
+
+    page = only_page(server)
+    assert response["id"] == page["id"]
+    assert upload._page_title(page) == "Report - 2026-10-12"
+    assert page["children"] == expected
+    assert server.faults == {"pages.create": [], "blocks.append": []}
+
+
+def test_stream_keeps_block_order_through_failures(server, notion):
+    markdown = long_report(10)
+    server.faults["blocks.append"] = ["429", "timeout-applied", "timeout", "503", "500-applied"]
+    chunks = [markdown[i:i + 7] for i in range(0, len(markdown), 7)]
+
+    stream_to_notion(chunks, title_prefix="Report", notion=notion, batch_blocks=3, date="2026-10-12")
+
+    assert only_page(server)["children"] == markdown_to_blocks(markdown)
+    assert server.faults["blocks.append"] == []
+
+
+def test_client_errors_are_not_retried(server, notion):
+    with pytest.raises(APIResponseError):
+        upload.call_with_retry(notion.blocks.children.append, block_id="missing", children=[])
+    assert server.pages == {}
+
+
+def failing_stream(markdown):
+    yield markdown
+    raise RuntimeError("LLM stream interrupted")
+
+
+def test_failed_stream_ends_with_a_failure_notice(server, notion):
+    markdown = long_report(5)
+
+    with pytest.raises(RuntimeError):
+        stream_to_notion(failing_stream(markdown), title_prefix="Report", notion=notion, batch_blocks=3)
+
+    children = only_page(server)["children"]
+    assert children[:-1] == markdown_to_blocks(markdown)[:len(children) - 1]
+    assert children[-1]["type"] == "callout"
+    assert upload.FAILURE_NOTICE in children[-1]["callout"]["rich_text"][0]["text"]["content"]
+
+
+def test_failed_stream_is_archived_when_the_notice_cannot_be_added(server, notion):
+    server.faults["blocks.append"] = ["400", "400"]
+
+    with pytest.raises(APIResponseError):
+        stream_to_notion([long_report(5)], title_prefix="Report", notion=notion, batch_blocks=3)
+
+    assert only_page(server)["archived"] is True
@@ -0,0 +1,126 @@
+"""
+Tests of the token windows and the mergers of per-window model outputs, with the fake pipelines.
+"""
+import random
+import re
+
+import pytest
+
+from benchmarks.fakes import ENTITIES, WORDS, fake_pipeline
+from src.nlp_pipeline import _windowed_ner, _windowed_qa, _windowed_sentiment, qa_questions
+from src.windowing import MAX_CHARS_PER_TOKEN, AnswerMerger, SentimentMerger, Window, iter_windows
+
+MAX_TOKENS = 50
+STRIDE = 10
+
+
+def long_text(n_words=3000, seed=0):
+    # Unlike the synthetic articles, entity names keep their capitals for the fake NER.
+    rng = random.Random(seed)
+    words = [rng.choice(ENTITIES) if rng.random() < 0.1 else rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words) + "."
+
+
+def word_tokenizer(text, **kwargs):
+    # Stands in for a fast tokenizer: one token per word or punctuation mark.
+    return {"offset_mapping": [(m.start(), m.end()) for m in re.finditer(r"\w+|[^\w\s]", text)]}
+
+
+def tokens_of(tokenizer, text):
+    if tokenizer is None:
+        return [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    return tokenizer(text)["offset_mapping"]
+
+
+@pytest.mark.parametrize("tokenizer", [None, word_tokenizer])
+def test_long_document_windows_are_bounded_overlapping_and_cover_every_token(tokenizer):
+    text = long_text()
+    tokens = tokens_of(tokenizer, text)
+    windows = list(iter_windows(text, tokenizer, MAX_TOKENS, STRIDE))
+
+    assert len(windows) > 10
+    covered = set()
+    for start, end, n_tokens in windows:
+        inside = [i for i, (s, e) in enumerate(tokens) if s >= start and e <= end]
+        assert len(inside) == n_tokens <= MAX_TOKENS
+        # Windows end on a token boundary of the whole text, not inside a word cut by the slice.
+        assert end in {e for _, e in tokens}
+        covered.update(inside)
+    assert covered == set(range(len(tokens)))
+
+    for (start, end, n_tokens), (next_start, _, _) in zip(windows, windows[1:]):
+        shared = [e for s, e in tokens if s >= next_start and e <= end]
+        assert next_start > start
+        assert len(shared) == STRIDE
+
+
+def test_window_slice_cutting_a_word_drops_the_cut_token():
+    # Words longer than MAX_CHARS_PER_TOKEN make every tokenized slice end inside a word.
+    word = "x" * (MAX_CHARS_PER_TOKEN + 5)
+    text = " ".join([word] * 200)
+    windows = list(iter_windows(text, word_tokenizer, MAX_TOKENS, STRIDE))
+
+    for start, end, n_tokens in windows:
+        assert text[start:end] == " ".join([word] * n_tokens)
+    assert windows[-1][1] == len(text)
+
+
+def test_entities_in_overlaps_are_reported_once_with_document_offsets(fake_models):
+    text = long_text()
+
+    entities, n_windows = _windowed_ner([text], batch_size=4)
+
+    assert n_windows > 1 and len(entities[0]) > 100
+    spans = [(e["start"], e["end"]) for e in entities[0]]
+    assert len(spans) == len(set(spans))
+    for entity in entities[0]:
+        assert text[entity["start"]:entity["end"]] == entity["word"]
+    # The fake NER is a regular expression, so the whole-text output is the ground truth.
+    expected = fake_pipeline("ner")(text)
+    assert [(e["word"], e["start"], e["end"]) for e in entities[0]] == \
+        [(e["word"], e["start"], e["end"]) for e in expected]
+
+
+def test_best_answer_is_kept_with_document_offsets():
+    text = "Intro. " * 20 + "The Commission adopted the AI Act. " + "Filler text. " * 20
+    first, second = Window(0, 0, 150, 30), Window(0, 100, len(text), 40)
+    merger = AnswerMerger(n_docs=1, n_questions=2)
+    answer = "The Commission adopted the AI Act"
+    local = text[second.start:].index(answer)
+
+    merger.add(second, 0, {"answer": answer, "score": 0.9, "start": local, "end": local + len(answer)})
+    merger.add(first, 0, {"answer": "Intro", "score": 0.4, "start": 0, "end": 5})
+
+    best, missing = merger.results()[0]
+    assert best["answer"] == answer and best["score"] == 0.9
+    assert text[best["start"]:best["end"]] == answer
+    assert missing == {"answer": "", "score": 0.0, "start": 0, "end": 0}
+
+
+def test_sentiment_is_weighted_by_window_length():
+    merger = SentimentMerger(n_docs=2)
+    merger.add(Window(0, 0, 0, 300), {"label": "POSITIVE", "score": 0.9})
+    merger.add(Window(0, 0, 0, 100), {"label": "NEGATIVE", "score": 0.9})
+    merger.add(Window(1, 0, 0, 10), {"label": "POSITIVE", "score": 0.8})
+    merger.add(Window(1, 0, 0, 90), {"label": "NEGATIVE", "score": 0.6})
+
+    mixed, negative = merger.results()
+    assert mixed["label"] == "POSITIVE" and mixed["score"] == pytest.approx(0.7)
+    assert negative["label"] == "NEGATIVE" and negative["score"] == pytest.approx(0.56)
+
+
+def test_one_window_documents_match_direct_pipeline_calls(fake_models):
+    texts = [long_text(120, seed=i) for i in range(5)]
+    ner, sentiment, qa = (fake_pipeline(task) for task in ("ner", "sentiment-analysis", "question-answering"))
+
+    entities, n_windows = _windowed_ner(texts, batch_size=2)
+    assert n_windows == len(texts)
+    assert entities == [ner(text) for text in texts]
+
+    sentiments, _ = _windowed_sentiment(texts, batch_size=2)
+    expected = sentiment(texts)
+    assert [s["label"] for s in sentiments] == [s["label"] for s in expected]
+    assert [s["score"] for s in sentiments] == pytest.approx([s["score"] for s in expected])
+
+    answers, _ = _windowed_qa(texts, batch_size=2)
+    assert answers == [[qa(question=q, context=text) for q in qa_questions] for text in texts]